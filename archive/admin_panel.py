@@ -2,19 +2,18 @@ from flask import Flask, render_template, request, redirect, url_for, flash, ses
 from functools import wraps
 from datetime import datetime
 import logging
-import os
 from config import (
     ADMIN_USERNAME, ADMIN_PASSWORD, SECRET_KEY,
     FLASK_HOST, FLASK_PORT
 )
+from database import init_db
 from models import db, User, Game, Transaction
-
-from telegram import Bot
-BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-bot = Bot(token=BOT_TOKEN)
+import ledger
+from utils.notify_user import notify_user
 
 app = Flask(__name__)
 app.secret_key = SECRET_KEY
+init_db(app)
 
 # 🔐 Admin login protection
 def admin_required(f):
@@ -42,7 +41,7 @@ def dashboard():
     players = User.query.all()
     games = Game.query.all()
     active_game = Game.query.filter_by(status="active").first()
-    pending_withdrawals = Transaction.query.filter_by(type="withdrawal", status="pending").all()
+    pending_withdrawals = Transaction.query.filter(Transaction.type.in_(ledger.DEBIT_TYPES), Transaction.status == "pending").all()
     pending_deposits = Transaction.query.filter_by(type="deposit", status="pending").all()
     return render_template(
         'admin/dashboard.html',
@@ -100,11 +99,14 @@ def call_number():
         flash("Game not active or not found")
         return redirect(url_for("dashboard"))
 
-    if number in game.called_numbers:
+    if not 1 <= number <= 75:
+        flash("Numbers run from 1 to 75")
+        return redirect(url_for("dashboard"))
+
+    if not game.call(number):
         flash(f"Number {number} already called")
         return redirect(url_for("dashboard"))
 
-    game.called_numbers.append(number)
     db.session.commit()
 
     logging.info(f"📢 Called number {number} in game {game_id}")
@@ -115,77 +117,62 @@ def call_number():
 @app.route('/admin/withdrawal/approve', methods=['POST'])
 @admin_required
 def approve_withdrawal():
-    user_id = request.form.get('user_id')
-    tx_id = request.form.get('tx_id')
-    amount = float(request.form.get('amount'))
-    user = User.query.get(user_id)
-    tx = Transaction.query.get(tx_id)
-    if not user or not tx:
-        flash('User or transaction not found')
+    tx_id = request.form.get('tx_id', type=int)
+    try:
+        tx, _ = ledger.approve(tx_id, "withdraw", approved_by=ADMIN_USERNAME)
+    except (ledger.TransactionNotPending, ledger.WrongTransactionType):
+        flash('Invalid transaction')
         return redirect(url_for('dashboard'))
-    if user.balance >= amount:
-        user.balance -= amount
-        tx.status = "approved"
-        tx.completed_at = datetime.utcnow()
-        db.session.commit()
-        logging.info(f"✅ Admin approved withdrawal TX {tx_id} for user {user_id}")
-        bot.send_message(chat_id=user.telegram_id, text=f"✅ Your withdrawal of {amount} birr was approved.")
-        flash('Withdrawal approved')
-    else:
+    except ledger.InsufficientFunds:
         flash('Insufficient balance')
+        return redirect(url_for('dashboard'))
+    logging.info(f"✅ Admin approved withdrawal TX {tx_id} for user {tx.user_id}")
+    notify_user(tx.user.telegram_id, f"✅ Your withdrawal of {tx.amount} birr was approved.")
+    flash('Withdrawal approved')
     return redirect(url_for('dashboard'))
 
 @app.route('/admin/withdrawal/reject', methods=['POST'])
 @admin_required
 def reject_withdrawal():
-    tx_id = request.form.get('tx_id')
+    tx_id = request.form.get('tx_id', type=int)
     reason = request.form.get('reason', 'No reason provided')
-    tx = Transaction.query.get(tx_id)
-    if not tx:
+    try:
+        tx = ledger.reject(tx_id, "withdraw", note=reason)
+    except (ledger.TransactionNotPending, ledger.WrongTransactionType):
         flash('Transaction not found')
         return redirect(url_for('dashboard'))
-    tx.status = "rejected"
-    tx.admin_note = reason
-    tx.completed_at = datetime.utcnow()
-    db.session.commit()
     logging.info(f"❌ Admin rejected withdrawal TX {tx_id} with reason: {reason}")
-    bot.send_message(chat_id=tx.user.telegram_id, text=f"❌ Your withdrawal request was rejected.\nReason: {reason}")
+    notify_user(tx.user.telegram_id, f"❌ Your withdrawal request was rejected.\nReason: {reason}")
     flash('Withdrawal rejected')
     return redirect(url_for('dashboard'))
 
 @app.route('/admin/deposit/approve', methods=['POST'])
 @admin_required
 def approve_deposit():
-    tx_id = request.form.get('tx_id')
-    tx = Transaction.query.get(tx_id)
-    if not tx or tx.status != "pending":
+    tx_id = request.form.get('tx_id', type=int)
+    try:
+        tx, _ = ledger.approve(tx_id, "deposit", approved_by=ADMIN_USERNAME)
+    except (ledger.TransactionNotPending, ledger.WrongTransactionType):
         flash('Invalid transaction')
         return redirect(url_for('dashboard'))
     user = tx.user
-    user.balance += tx.amount
-    tx.status = "approved"
-    tx.completed_at = datetime.utcnow()
-    db.session.commit()
     logging.info(f"✅ Admin approved deposit TX {tx_id} for user {user.id}")
-    bot.send_message(chat_id=user.telegram_id, text=f"✅ Your deposit of {tx.amount} birr was approved.")
+    notify_user(user.telegram_id, f"✅ Your deposit of {tx.amount} birr was approved.")
     flash('Deposit approved')
     return redirect(url_for('dashboard'))
 
 @app.route('/admin/deposit/reject', methods=['POST'])
 @admin_required
 def reject_deposit():
-    tx_id = request.form.get('tx_id')
+    tx_id = request.form.get('tx_id', type=int)
     reason = request.form.get('reason', 'No reason provided')
-    tx = Transaction.query.get(tx_id)
-    if not tx:
+    try:
+        tx = ledger.reject(tx_id, "deposit", note=reason)
+    except (ledger.TransactionNotPending, ledger.WrongTransactionType):
         flash('Transaction not found')
         return redirect(url_for('dashboard'))
-    tx.status = "rejected"
-    tx.admin_note = reason
-    tx.completed_at = datetime.utcnow()
-    db.session.commit()
     logging.info(f"❌ Admin rejected deposit TX {tx_id} with reason: {reason}")
-    bot.send_message(chat_id=tx.user.telegram_id, text=f"❌ Your deposit was rejected.\nReason: {reason}")
+    notify_user(tx.user.telegram_id, f"❌ Your deposit was rejected.\nReason: {reason}")
     flash('Deposit rejected')
     return redirect(url_for('dashboard'))
 
@@ -201,12 +188,17 @@ def user_profile(user_id):
 @app.route('/admin/update_balance/<int:user_id>', methods=["POST"])
 @admin_required
 def update_balance(user_id):
-    amount = float(request.form.get("amount", 0))
     user = User.query.get(user_id)
     if user:
-        user.balance += amount
-        db.session.commit()
-        flash(f"💰 Updated balance for {user.username}")
+        try:
+            ledger.apply(user.id, request.form.get("amount", 0), "adjustment")
+            db.session.commit()
+            flash(f"💰 Updated balance for {user.username}")
+        except ValueError:
+            flash("Invalid amount")
+        except ledger.InsufficientFunds:
+            db.session.rollback()
+            flash("Balance cannot go below zero")
     return redirect(url_for("user_profile", user_id=user_id))
 
 @app.route('/admin/cartela/<int:game_id>/<int:user_id>/<int:cartela_number>')
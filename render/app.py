@@ -1,27 +1,91 @@
 # app.py
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from database import db, init_db
 from models import User, Game, GameParticipant, Transaction
-from game_logic import BingoGame
+from game_logic import MAX_CARTELAS
+from scheduler import call_scheduler
+from registry import GameRegistry, RegistryFull, STATUSES
+from persistence import GamePersister
+from broadcast import broadcaster
+from metrics import init_metrics, stats_collector
+from user_cache import user_cache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from sqlalchemy import and_, or_
+from cache import TTLCache
+from leaderboard import leaderboards, WINDOWS
+import ledger
+import base64
+import json
+import logging
 import os
 
 # 🔧 Flask App Setup
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET", "arada_secret_key")
 
-# 🧠 Database Initialization
-try:
-    init_db(app)
-except RuntimeError as e:
-    print(f"❌ Database setup error: {e}")
-    # Fallback to SQLite for local development
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///arada.db"
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    db.init_app(app)
+# 🧠 Database Initialization (falls back to SQLite for local development)
+init_db(app)
 
 # 🎮 In-memory game store
-active_games = {}
+active_games = GameRegistry()
+
+# 💰 Payouts and refunds run on one worker thread, in the order games close, so the draw that
+# ends a game (on the scheduler thread, under game.lock) never waits on the database. Queued
+# work still runs at interpreter exit, as concurrent.futures joins its workers.
+settlements = ThreadPoolExecutor(max_workers=1, thread_name_prefix="settle")
+
+def record_settlement(game, old_status, new_status):
+    # Called as a game finishes or expires; copies what the ledger needs and queues it
+    if new_status == "finished" and game.payouts:
+        settlements.submit(pay_out, game.game_id, dict(game.payouts), list(game.players))
+    elif new_status == "expired":
+        settlements.submit(refund_entries, game.game_id)
+
+def pay_out(game_id, payouts, players):
+    # Pays the winners through the ledger, then ranks them
+    try:
+        with app.app_context():
+            paid = ledger.settle_game(game_id, payouts, players)
+    except Exception:
+        logging.exception(f"❌ Could not pay out game {game_id}")
+        return
+    for user_id, amount in paid.items():
+        leaderboards.record_win(user_id, float(amount))
+
+def refund_entries(game_id, user_id=None, limit=None):
+    # Entry fees back to the players of a room that closed without a game, or to one whose seat fell through
+    try:
+        with app.app_context():
+            ledger.refund_entries(game_id, user_id, limit)
+    except Exception:
+        logging.exception(f"❌ Could not refund entry fees for game {game_id}")
+
+# Per game rather than active_games.listeners: an expiring room has already left the registry
+active_games.add_listeners.append(lambda game: game.status_listeners.append(record_settlement))
+
+# 💾 Write-behind saving of live games; rooms from before a restart are resumed here
+persister = GamePersister(app)
+persister.attach(active_games)
+
+# 📣 Every draw announced to the room's players over Telegram
+broadcaster.attach(active_games)
+
+# 📈 Request latency, game gauges and GET /metrics
+metrics = init_metrics(app, active_games)
+metrics.collectors.append(stats_collector("bingo_scheduler", call_scheduler.stats))
+metrics.collectors.append(stats_collector("bingo_persist", persister.stats))
+metrics.collectors.append(stats_collector("bingo_user_cache", user_cache.stats))
+metrics.collectors.append(stats_collector("bingo_broadcast", broadcaster.stats))
+
+try:
+    persister.restore(active_games)
+except Exception:
+    logging.exception("❌ Could not restore games from the database")
+persister.start()
+
+STREAM_HEARTBEAT = 15  # seconds between keep-alive comments on idle streams
+OPEN_STATUSES = ("waiting", "active")  # Rooms that still take players
 
 # -------------------- GAME ROUTES --------------------
 
@@ -29,10 +93,19 @@ active_games = {}
 def create_game():
     data = request.json
     entry_price = data.get("entry_price", 10)
-    game = BingoGame(game_id=len(active_games) + 1, entry_price=entry_price)
-    active_games[game.game_id] = game
+    try:
+        game = active_games.create(entry_price=entry_price)
+    except RegistryFull as e:
+        return jsonify({"error": str(e)}), 503
     return jsonify({"game_id": game.game_id})
 
+@app.route("/games", methods=["GET"])
+def list_games():
+    status = request.args.get("status", "waiting")
+    if status not in STATUSES:
+        return jsonify({"error": "Unknown status"}), 400
+    return jsonify([game.summary() for game in active_games.by_status(status)])
+
 @app.route("/game/join", methods=["POST"])
 def join_game():
     data = request.json
@@ -44,18 +117,170 @@ def join_game():
     if not game:
         return jsonify({"error": "Game not found"}), 404
 
-    board = game.add_player(user_id, cartela_number)
+    if cartela_number is not None:
+        # Accepts 7 or "7"; anything else, or a number outside the catalogue, is the client's mistake
+        try:
+            cartela_number = int(str(cartela_number))
+        except ValueError:
+            cartela_number = None
+        if not game.cartela_pool.valid(cartela_number):
+            return jsonify({"error": f"Cartela number must be 1-{game.cartela_pool.size}"}), 400
+
+    with game.lock:
+        if game.status not in OPEN_STATUSES:
+            return jsonify({"error": "Game is over"}), 409
+        if len(game.player_cartelas(user_id)) >= MAX_CARTELAS:
+            return jsonify({"error": f"You already have the maximum of {MAX_CARTELAS} cartelas"}), 409
+
+    # 💵 The entry fee is taken before the seat, outside the game lock; a seat that falls through is refunded
+    account = None
+    fee = ledger.to_amount(game.entry_price)
+    if fee > 0:
+        account = User.query.filter_by(telegram_id=user_id).first()
+        if not account:
+            return jsonify({"error": "User not found"}), 404
+        try:
+            ledger.record(account.id, -fee, "game_entry", reference=f"game:{game.game_id}")
+        except ledger.InsufficientFunds:
+            return jsonify({"error": "Insufficient balance"}), 400
+
+    with game.lock:
+        board = game.add_player(user_id, cartela_number) if game.status in OPEN_STATUSES else ()
+        if board:
+            if "sound" in data:
+                game.toggle_sound(user_id, bool(data["sound"]))
+            if "notify" in data:
+                game.toggle_notify(user_id, bool(data["notify"]))
+    if not board:
+        if account:
+            settlements.submit(refund_entries, game.game_id, account.id, fee)
+        return jsonify({"error": "Cartela not available"}), 409
     return jsonify({"cartela": board})
 
+@app.route("/game/<int:game_id>/cartelas", methods=["GET"])
+def available_cartelas(game_id):
+    game = active_games.get(game_id)
+    if not game:
+        return jsonify({"error": "Game not found"}), 404
+
+    return jsonify({
+        "total": game.cartela_pool.size,
+        "available": sorted(game.cartela_pool.available())
+    })
+
+@app.route("/game/<int:game_id>/select", methods=["GET"])
+def select_cartela(game_id):
+    game = active_games.get(game_id)
+    if not game:
+        return jsonify({"error": "Game not found"}), 404
+
+    return render_template(
+        "cartela_selection.html",
+        game_id=game_id,
+        entry_price=game.entry_price,
+        cartela_total=game.cartela_pool.size,
+        available=game.cartela_pool.available()
+    )
+
 @app.route("/game/call/<int:game_id>", methods=["POST"])
 def call_number(game_id):
     game = active_games.get(game_id)
     if not game:
         return jsonify({"error": "Game not found"}), 404
 
-    result = game.call_number()
+    with game.lock:
+        if game.status != "active":
+            return jsonify({"error": f"Game is {game.status}"}), 409
+        result = game.draw()
     return jsonify(result)
 
+def sse(event_id: int, event: str, data) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route("/game/<int:game_id>/stream", methods=["GET"])
+def stream_game(game_id):
+    game = active_games.get(game_id)
+    if not game:
+        return jsonify({"error": "Game not found"}), 404
+
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id", "0")
+    last_seq = int(last_id) if last_id.isdigit() else 0
+
+    def generate():
+        seq = last_seq
+        yield "retry: 3000\n\n"
+        events, complete = game.events.since(seq)
+        if not seq or not complete:
+            # New viewers, and clients whose missed events are no longer kept, start from a snapshot
+            state = game.public_state()
+            seq = state["seq"]
+            yield sse(seq, "snapshot", state)
+            events = []
+        while True:
+            for event in events:
+                seq = event.seq
+                yield sse(event.seq, event.type, event.data)
+            if not events:
+                if game.status == "finished" or game.game_id not in active_games:
+                    # Tells EventSource not to reconnect
+                    yield sse(seq, "end", {"status": game.status})
+                    return
+                yield ": heartbeat\n\n"
+            events, complete = game.events.wait(seq, STREAM_HEARTBEAT)
+            if not complete:
+                state = game.public_state()
+                seq = state["seq"]
+                yield sse(seq, "snapshot", state)
+                events = []
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/game/<int:game_id>/state", methods=["GET"])
+def game_state(game_id):
+    game = active_games.get(game_id)
+    if not game:
+        return jsonify({"error": "Game not found"}), 404
+
+    since = request.args.get("since", 0, type=int)
+    user_id = request.args.get("user_id", type=int)
+
+    events, complete = game.events.since(since)
+    if not since or not complete:
+        # Taken under the game lock so seq, calls and marks describe the same moment
+        with game.lock:
+            state = game.public_state()
+            marks = [[cartela.number, number] for cartela in game.player_cartelas(user_id)
+                     for number in cartela.marked()] if user_id else []
+        data = {"seq": state["seq"], "full": True, "status": state["status"], "calls": state["called"],
+                "marks": marks, "winners": state["winners"]}
+    else:
+        # seq comes from the same since() call as the events, never from a later read of the log
+        data = {"seq": events[-1].seq if events else since, "full": False, "status": game.status,
+                "calls": [], "marks": []}
+        for event in events:
+            if event.type == "call":
+                data["calls"].append(event.data["number"])
+            elif event.type == "mark" and user_id in (None, event.data["user_id"]):
+                data["marks"].append([event.data["cartela"], event.data["number"]])
+            elif event.type == "win":
+                data["winners"] = event.data["winners"]
+            elif event.type == "status" and event.data["status"] == "waiting":
+                data["reset"] = True
+
+    # The body only depends on these, so a matching ETag means nothing changed for this client
+    etag = f"{game_id}-{data['seq']}-{since}-{user_id or ''}"
+    if request.if_none_match.contains(etag):
+        return "", 304, {"ETag": f'"{etag}"', "Cache-Control": "no-cache"}
+
+    response = jsonify(data)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
 @app.route("/game/mark", methods=["POST"])
 def mark_number():
     data = request.json
@@ -67,11 +292,14 @@ def mark_number():
     if not game:
         return jsonify({"error": "Game not found"}), 404
 
-    updated = game.mark_number(user_id, number)
-    win, message = game.check_winner(user_id)
+    with game.lock:
+        if game.status != "active":
+            return jsonify({"error": f"Game is {game.status}"}), 409
+        updated = game.mark_number(user_id, number)
+        win, message = game.check_winner(user_id)
 
-    if win:
-        game.end_game(user_id)
+        if win:
+            game.end_game(user_id)
 
     return jsonify({
         "marked": updated,
@@ -90,6 +318,10 @@ def deposit():
     phone = data.get("phone")
     code = data.get("code")
 
+    try:
+        amount = ledger.to_amount(amount)
+    except ValueError:
+        return jsonify({"error": "Invalid amount"}), 400
     if amount < 30:
         return jsonify({"error": "Minimum deposit is 30 ETB"}), 400
 
@@ -97,22 +329,14 @@ def deposit():
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    tx = Transaction(
-        user_id=user.id,
-        type="deposit",
-        amount=amount,
+    _, balance = ledger.record(
+        user.id, amount, "deposit",
         method=method,
         deposit_phone=phone,
-        transaction_id=code,
-        status="completed",
-        created_at=datetime.utcnow(),
-        completed_at=datetime.utcnow()
+        transaction_id=code
     )
-    db.session.add(tx)
-    user.balance += amount
-    db.session.commit()
 
-    return jsonify({"message": "Deposit confirmed", "new_balance": user.balance})
+    return jsonify({"message": "Deposit confirmed", "new_balance": float(balance)})
 
 @app.route("/withdraw", methods=["POST"])
 def withdraw():
@@ -121,6 +345,14 @@ def withdraw():
     amount = data.get("amount")
     phone = data.get("phone")
 
+    try:
+        amount = ledger.to_amount(amount)
+    except ValueError:
+        return jsonify({"error": "Invalid amount"}), 400
+    if amount <= 0:
+        return jsonify({"error": "Invalid amount"}), 400
+
+    # Advisory only: the balance is debited, atomically, when an admin approves the request
     user = User.query.get(user_id)
     if not user or user.balance < amount:
         return jsonify({"error": "Insufficient balance"}), 400
@@ -141,67 +373,157 @@ def withdraw():
 
 # -------------------- ADMIN ROUTES --------------------
 
+# Cached per filter combination; the listing itself is always live
+transaction_counts = TTLCache(maxsize=256, ttl=30)
+
+def encode_cursor(created_at: datetime, tx_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{tx_id}".encode()).decode()
+
+def decode_cursor(cursor: str):
+    created_at, tx_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(created_at), int(tx_id)
+
 @app.route("/admin/transactions", methods=["GET"])
 def admin_transactions():
-    txs = Transaction.query.order_by(Transaction.created_at.desc()).limit(50).all()
-    data = []
-    for tx in txs:
-        user = User.query.get(tx.user_id)
-        data.append({
+    limit = max(1, min(request.args.get("limit", 50, type=int), 200))
+
+    filters = []
+    for field in ("status", "type", "method"):
+        value = request.args.get(field)
+        if value:
+            filters.append(getattr(Transaction, field) == value)
+    try:
+        if request.args.get("from"):
+            filters.append(Transaction.created_at >= datetime.fromisoformat(request.args["from"]))
+        if request.args.get("to"):
+            filters.append(Transaction.created_at < datetime.fromisoformat(request.args["to"]))
+    except ValueError:
+        return jsonify({"error": "Dates must be ISO formatted"}), 400
+
+    # One joined query per page instead of a User lookup per row
+    query = (
+        Transaction.query
+        .outerjoin(User, User.id == Transaction.user_id)
+        .add_columns(User.username)
+        .filter(*filters)
+    )
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            created_at, tx_id = decode_cursor(cursor)
+        except (ValueError, UnicodeDecodeError):
+            return jsonify({"error": "Invalid cursor"}), 400
+        # Keyset pagination on (created_at, id): seeks with the index instead of OFFSET scans
+        query = query.filter(or_(
+            Transaction.created_at < created_at,
+            and_(Transaction.created_at == created_at, Transaction.id < tx_id)
+        ))
+
+    rows = query.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    data = [
+        {
             "id": tx.id,
-            "user": user.username if user else "unknown",
+            "user": username or "unknown",
             "type": tx.type,
-            "amount": tx.amount,
+            "amount": float(tx.amount),
             "method": tx.method,
             "reference": tx.reference,
             "status": tx.status,
             "created_at": tx.created_at.isoformat()
-        })
-    return jsonify(data)
+        }
+        for tx, username in rows
+    ]
 
-@app.route("/admin/approve/<int:tx_id>", methods=["POST"])
-def approve_transaction(tx_id):
-    tx = Transaction.query.get(tx_id)
-    if not tx or tx.status != "pending":
-        return jsonify({"error": "Transaction not found or already processed"}), 400
+    count_key = tuple(sorted((k, v) for k, v in request.args.items() if k in ("status", "type", "method", "from", "to")))
+    total = transaction_counts.get_or_set(count_key, lambda: Transaction.query.filter(*filters).count())
 
-    tx.status = "approved"
-    tx.completed_at = datetime.utcnow()
+    last_tx = rows[-1][0] if rows else None
+    return jsonify({
+        "transactions": data,
+        "total": total,
+        "next_cursor": encode_cursor(last_tx.created_at, last_tx.id) if has_more else None
+    })
 
-    user = User.query.get(tx.user_id)
-    if tx.type == "deposit":
-        user.balance += tx.amount
-    elif tx.type == "withdraw":
-        user.balance -= tx.amount
+def expected_type():
+    # Optional: the type the admin saw when they clicked, so a request cannot be settled as another kind
+    data = request.get_json(silent=True) or {}
+    return data.get("type") or request.args.get("type")
 
-    db.session.commit()
+@app.route("/admin/approve/<int:tx_id>", methods=["POST"])
+def approve_transaction(tx_id):
+    try:
+        ledger.approve(tx_id, expected_type())
+    except ledger.TransactionNotPending:
+        return jsonify({"error": "Transaction not found or already processed"}), 400
+    except ledger.WrongTransactionType as e:
+        return jsonify({"error": str(e)}), 409
+    except ledger.InsufficientFunds:
+        return jsonify({"error": "Insufficient balance"}), 400
     return jsonify({"message": "Transaction approved."})
 
 @app.route("/admin/reject/<int:tx_id>", methods=["POST"])
 def reject_transaction(tx_id):
-    tx = Transaction.query.get(tx_id)
-    if not tx or tx.status != "pending":
+    try:
+        ledger.reject(tx_id, expected_type())
+    except ledger.TransactionNotPending:
         return jsonify({"error": "Transaction not found or already processed"}), 400
-
-    tx.status = "rejected"
-    db.session.commit()
+    except ledger.WrongTransactionType as e:
+        return jsonify({"error": str(e)}), 409
     return jsonify({"message": "Transaction rejected."})
 
+@app.route("/admin/scheduler", methods=["GET"])
+def scheduler_stats():
+    return jsonify(call_scheduler.stats())
+
+@app.route("/admin/persistence", methods=["GET"])
+def persistence_stats():
+    return jsonify(persister.stats())
+
+@app.route("/admin/broadcast", methods=["GET"])
+def broadcast_stats():
+    return jsonify(broadcaster.stats())
+
 # -------------------- LEADERBOARD --------------------
 
 @app.route("/leaderboard", methods=["GET"])
 def leaderboard():
+    # The original all-time board, kept as it was for existing clients
     top_users = User.query.order_by(User.games_won.desc(), User.balance.desc()).limit(10).all()
     data = [
         {
             "username": user.username,
             "wins": user.games_won,
-            "balance": user.balance
+            "balance": float(user.balance or 0)
         }
         for user in top_users
     ]
     return jsonify(data)
 
+@app.route("/leaderboard/top", methods=["GET"])
+def leaderboard_top():
+    # Jackpot wins and earnings per window (daily, weekly, all), from the in-memory boards
+    window = request.args.get("window", "all")
+    if window not in WINDOWS:
+        return jsonify({"error": "Unknown window"}), 400
+    return jsonify(leaderboards.top(window))
+
+@app.route("/leaderboard/page", methods=["GET"])
+def leaderboard_page():
+    return render_template(
+        "leaderboard.html",
+        boards=[
+            ("Today", leaderboards.top("daily")),
+            ("This Week", leaderboards.top("weekly")),
+            ("All Time", leaderboards.top("all"))
+        ],
+        most_active=User.query.order_by(User.games_played.desc().nulls_last()).limit(10).all(),
+        richest=User.query.order_by(User.balance.desc()).limit(10).all()
+    )
+
 # -------------------- START SERVER --------------------
 
 if __name__ == "__main__":
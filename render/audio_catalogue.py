@@ -0,0 +1,202 @@
+# audio_catalogue.py — number-call voice clips, uploaded to Telegram once
+#
+# Each language pack is a folder audio/<pack>/ next to this module holding b1.ogg … o75.ogg. The bot
+# preloads every pack into memory at startup (others load a pack on first use). The first send of a clip uploads its bytes and
+# keeps the file_id Telegram returns, saved to AUDIO_FILE_IDS_FILE, so every later send — in any
+# chat, after restarts — passes just that id. file_ids belong to one bot, so they are stored per
+# bot id. Clips are sent through the outbox: outbox.send(chat_id, audio_catalogue.clip(number)).
+#
+# The bot and the web workers share the file. Each write holds an exclusive lock on
+# AUDIO_FILE_IDS_FILE.lock, re-reads the file and changes only its own key, so processes never
+# drop each other's ids; a process also re-reads it once before uploading a clip it has no id for.
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are only serialised within the process
+    fcntl = None
+
+from telegram import InputFile
+from telegram.error import BadRequest
+
+from config import TELEGRAM_BOT_TOKEN, AUDIO_DIR, AUDIO_DEFAULT_PACK, AUDIO_FILE_IDS_FILE
+
+# User.language -> pack folder; languages without their own recordings use AUDIO_DEFAULT_PACK
+LANGUAGE_PACKS = {"am": "amharic"}
+
+
+def clip_name(number: int) -> str:
+    # 7 -> "b7", 75 -> "o75"
+    return "bingo"[(number - 1) // 15] + str(number)
+
+
+class VoiceClip:
+    __slots__ = ("catalogue", "key", "name", "data")
+
+    def __init__(self, catalogue: "AudioCatalogue", key: str, name: str, data: bytes):
+        self.catalogue = catalogue
+        self.key = key
+        self.name = name
+        self.data = data
+
+    async def deliver(self, bot: Any, chat_id: int, **kwargs: Any):
+        # Called by the outbox; uploads at most once per clip, concurrent first sends wait for it.
+        # kwargs (a caption, say) go to every send_voice call.
+        file_id = self.catalogue.file_id(self.key)
+        if file_id is not None:
+            try:
+                await bot.send_voice(chat_id=chat_id, voice=file_id, **kwargs)
+                return
+            except BadRequest as e:
+                if "file identifier" not in e.message.lower():
+                    raise
+                # Stale id (the token now belongs to another bot): upload again below
+                self.catalogue.forget(self.key, file_id)
+        async with self.catalogue.upload_lock(self.key):
+            # Another process may have uploaded it since this one read the file
+            file_id = self.catalogue.file_id(self.key, reload=True)
+            if file_id is None:
+                message = await bot.send_voice(chat_id=chat_id, voice=InputFile(self.data, filename=self.name), **kwargs)
+                self.catalogue.remember(self.key, message.voice.file_id)
+                return
+        await bot.send_voice(chat_id=chat_id, voice=file_id, **kwargs)
+
+
+class AudioCatalogue:
+    def __init__(self, directory: str = AUDIO_DIR, default_pack: str = AUDIO_DEFAULT_PACK,
+                 ids_file: str = AUDIO_FILE_IDS_FILE, bot_id: Optional[str] = None):
+        self.directory = directory
+        self.default_pack = default_pack
+        self.ids_file = ids_file
+        self.bot_id = bot_id or (TELEGRAM_BOT_TOKEN or "").split(":")[0] or "fake"
+        self._packs: Dict[str, Dict[int, VoiceClip]] = {}
+        self._file_ids: Optional[Dict[str, Dict[str, str]]] = None  # bot id -> clip key -> file_id
+        self._upload_locks: Dict[str, asyncio.Lock] = {}
+        self._lock = threading.Lock()
+
+    # -------------------- CLIPS --------------------
+
+    def pack_for(self, language: Optional[str]) -> str:
+        pack = LANGUAGE_PACKS.get(language or "", self.default_pack)
+        return pack if os.path.isdir(os.path.join(self.directory, pack)) else self.default_pack
+
+    def clip(self, number: int, language: Optional[str] = None) -> Optional[VoiceClip]:
+        return self.load_pack(self.pack_for(language)).get(number)
+
+    def preload(self) -> int:
+        # Loads every pack folder up front; returns the number of clips in memory
+        try:
+            packs = sorted(entry.name for entry in os.scandir(self.directory) if entry.is_dir())
+        except OSError:
+            logging.warning(f"⚠️ Audio folder {self.directory} not found")
+            return 0
+        return sum(len(self.load_pack(pack)) for pack in packs)
+
+    def load_pack(self, pack: str) -> Dict[int, VoiceClip]:
+        # Reads the whole pack once (75 small .ogg files); a missing folder or clip is logged, not raised
+        clips = self._packs.get(pack)
+        if clips is not None:
+            return clips
+        with self._lock:
+            if pack in self._packs:
+                return self._packs[pack]
+            clips = {}
+            folder = os.path.join(self.directory, pack)
+            for number in range(1, 76):
+                name = f"{clip_name(number)}.ogg"
+                try:
+                    with open(os.path.join(folder, name), "rb") as f:
+                        clips[number] = VoiceClip(self, f"{pack}/{name}", name, f.read())
+                except OSError:
+                    pass
+            if len(clips) < 75:
+                logging.warning(f"⚠️ Audio pack {folder} has {len(clips)} of 75 number clips")
+            self._packs[pack] = clips
+            return clips
+
+    # -------------------- FILE IDS --------------------
+
+    def _read(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.ids_file) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            logging.exception(f"❌ Could not read {self.ids_file}, clips will be uploaded again")
+            return {}
+
+    def _ids(self) -> Dict[str, str]:
+        if self._file_ids is None:
+            self._file_ids = self._read()
+        return self._file_ids.setdefault(self.bot_id, {})
+
+    def file_id(self, key: str, reload: bool = False) -> Optional[str]:
+        with self._lock:
+            if reload and key not in self._ids():
+                self._file_ids = self._read()
+            return self._ids().get(key)
+
+    def upload_lock(self, key: str) -> asyncio.Lock:
+        # Only used on the outbox loop
+        return self._upload_locks.setdefault(key, asyncio.Lock())
+
+    def remember(self, key: str, file_id: str):
+        with self._lock, self._file_lock():
+            self._file_ids = self._read()
+            self._ids()[key] = file_id
+            self._save()
+
+    def forget(self, key: str, file_id: str):
+        # Only if still current, so a fresh id uploaded meanwhile (here or elsewhere) survives
+        with self._lock, self._file_lock():
+            self._file_ids = self._read()
+            if self._ids().get(key) == file_id:
+                del self._ids()[key]
+                self._save()
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        # Held across read-modify-write so two processes cannot save over each other's ids
+        lock = None
+        if fcntl is not None:
+            try:
+                lock = open(f"{self.ids_file}.lock", "a")
+            except OSError:
+                logging.exception(f"❌ Could not lock {self.ids_file}")
+        if lock is None:
+            yield
+            return
+        with lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _save(self):
+        # Written whole and renamed into place, so a crash never leaves a truncated file
+        tmp = f"{self.ids_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self._file_ids, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.ids_file)
+        except OSError:
+            logging.exception(f"❌ Could not save {self.ids_file}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "packs_loaded": len(self._packs),
+                "clips_loaded": sum(len(clips) for clips in self._packs.values()),
+                "file_ids": len(self._ids()),
+            }
+
+
+audio_catalogue = AudioCatalogue()
@@ -0,0 +1,212 @@
+# benchmark.py — latency benchmarks for the game_logic hot paths
+#
+# Usage:
+#   python benchmark.py                                  # full matrix, print table
+#   python benchmark.py --save bench_baseline.json       # record a baseline
+#   python benchmark.py --compare bench_baseline.json    # exit 1 on regressions beyond --threshold
+import argparse
+import json
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from cartelas import CartelaCatalogue
+from game_logic import BingoGame
+
+DEFAULT_CARTELAS = "1,10,100,500"
+DEFAULT_ROOMS = "1,10,100,1000"
+MAX_SAMPLES = 200_000
+
+clock = time.perf_counter_ns
+
+
+def new_room(game_id: int, catalogue: CartelaCatalogue, cartelas: int = 0) -> BingoGame:
+    game = BingoGame(game_id, seed=f"bench:{game_id}", catalogue=catalogue)
+    # More than the catalogue holds, so no join (here or in bench_add_player) starts the game
+    game.min_players = len(catalogue) + 1
+    for user_id in range(1, cartelas + 1):
+        game.add_player(user_id, mode="manual")
+    return game
+
+
+def restart(game: BingoGame):
+    game.reset_game()
+    game.start_game()
+
+
+def bench_add_player(games: List[BingoGame], cartelas: int, budget: float) -> List[int]:
+    samples = []
+    catalogue = games[0].catalogue
+    rooms = [new_room(game.game_id, catalogue) for game in games]
+    deadline = time.perf_counter() + budget
+    while time.perf_counter() < deadline and len(samples) < MAX_SAMPLES:
+        for i, game in enumerate(rooms):
+            if game.total_players() >= cartelas:
+                game = rooms[i] = new_room(game.game_id, catalogue)
+            user_id = game.total_players() + 1
+            start = clock()
+            game.add_player(user_id, mode="manual")
+            samples.append(clock() - start)
+    return samples
+
+
+def bench_call_number(games: List[BingoGame], cartelas: int, budget: float) -> List[int]:
+    samples = []
+    deadline = time.perf_counter() + budget
+    while time.perf_counter() < deadline and len(samples) < MAX_SAMPLES:
+        for game in games:
+            if game.deck_cursor >= len(game.deck):
+                restart(game)
+            start = clock()
+            game.call_number()
+            samples.append(clock() - start)
+    return samples
+
+
+def _per_player(op: Callable[[BingoGame, int, int], object]):
+    # Draws a number untimed, then times op(game, user_id, number) for every player in the room
+    def bench(games: List[BingoGame], cartelas: int, budget: float) -> List[int]:
+        samples = []
+        deadline = time.perf_counter() + budget
+        while time.perf_counter() < deadline and len(samples) < MAX_SAMPLES:
+            for game in games:
+                if game.deck_cursor >= len(game.deck):
+                    restart(game)
+                game.call_number()
+                number = game.called_numbers[-1]
+                for user_id in game.players:
+                    start = clock()
+                    op(game, user_id, number)
+                    samples.append(clock() - start)
+        return samples
+    return bench
+
+
+bench_mark_number = _per_player(lambda game, user_id, number: game.mark_number(user_id, number))
+bench_check_winner = _per_player(lambda game, user_id, number: game.check_winner(user_id))
+
+
+def bench_auto_call(games: List[BingoGame], cartelas: int, budget: float) -> List[int]:
+    samples = []
+    deadline = time.perf_counter() + budget
+    while time.perf_counter() < deadline and len(samples) < MAX_SAMPLES:
+        for game in games:
+            if game.status != "active":
+                restart(game)
+            start = clock()
+            game.auto_call(None, None)
+            samples.append(clock() - start)
+    return samples
+
+
+def bench_get_leaderboard(games: List[BingoGame], cartelas: int, budget: float) -> List[int]:
+    for game in games:
+        for user_id in game.players:
+            game.leaderboard.add(user_id, user_id % 7, user_id * 13 % 997)
+    samples = []
+    deadline = time.perf_counter() + budget
+    while time.perf_counter() < deadline and len(samples) < MAX_SAMPLES:
+        for game in games:
+            start = clock()
+            game.get_leaderboard()
+            samples.append(clock() - start)
+    return samples
+
+
+BENCHMARKS: Dict[str, Callable[[List[BingoGame], int, float], List[int]]] = {
+    "add_player": bench_add_player,
+    "call_number": bench_call_number,
+    "mark_number": bench_mark_number,
+    "check_winner": bench_check_winner,
+    "auto_call": bench_auto_call,
+    "get_leaderboard": bench_get_leaderboard,
+}
+
+
+def summarize(samples: List[int]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] / 1000, 3)
+
+    return {
+        "ops": len(ordered),
+        "ops_per_sec": round(len(ordered) / (sum(ordered) / 1e9), 1),
+        "p50_us": pct(0.50),
+        "p99_us": pct(0.99),
+    }
+
+
+def run(names: List[str], cartelas_list: List[int], rooms_list: List[int], budget: float,
+        max_cartelas: int) -> Dict[str, Dict[str, float]]:
+    catalogue = CartelaCatalogue.generate(max(cartelas_list))
+    results = {}
+    for cartelas in cartelas_list:
+        for rooms in rooms_list:
+            if cartelas * rooms > max_cartelas:
+                continue
+            for name in names:
+                games = [new_room(game_id, catalogue, cartelas) for game_id in range(1, rooms + 1)]
+                for game in games:
+                    game.start_game()
+                key = f"{name}[cartelas={cartelas},rooms={rooms}]"
+                results[key] = summarize(BENCHMARKS[name](games, cartelas, budget))
+                row = results[key]
+                print(f"{key:<48} {row['ops_per_sec']:>14,.0f} ops/s  p50 {row['p50_us']:>9.2f} µs  p99 {row['p99_us']:>9.2f} µs")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    # Throughput and median latency gate the run; p99 is reported but too noisy to fail on
+    failures = []
+    for key, row in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if row["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold):
+            failures.append(f"{key}: {row['ops_per_sec']:,.0f} ops/s vs baseline {base['ops_per_sec']:,.0f}")
+        if row["p50_us"] > base["p50_us"] * (1 + threshold):
+            failures.append(f"{key}: p50 {row['p50_us']} µs vs baseline {base['p50_us']} µs")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark BingoGame hot paths across room sizes and room counts.")
+    parser.add_argument("--bench", default=",".join(BENCHMARKS), help="comma-separated benchmark names")
+    parser.add_argument("--cartelas", default=DEFAULT_CARTELAS, help="comma-separated cartelas per room")
+    parser.add_argument("--rooms", default=DEFAULT_ROOMS, help="comma-separated concurrent room counts")
+    parser.add_argument("--budget", type=float, default=0.25, help="seconds per benchmark case")
+    parser.add_argument("--max-cartelas", type=int, default=100_000, help="skip cases with more cartelas in total")
+    parser.add_argument("--save", help="write results as a baseline file")
+    parser.add_argument("--compare", help="baseline file to check against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    names = [name for name in args.bench.split(",") if name]
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = run(
+        names,
+        [int(c) for c in args.cartelas.split(",")],
+        [int(r) for r in args.rooms.split(",")],
+        args.budget,
+        args.max_cartelas,
+    )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            failures = compare(results, json.load(f), args.threshold)
+        for failure in failures:
+            print(f"❌ {failure}", file=sys.stderr)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
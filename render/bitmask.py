@@ -0,0 +1,54 @@
+# bitmask.py — numbers 1..75 as a 75-bit mask split over two signed BIGINT columns
+from typing import Iterable, List, Tuple
+
+MAX_NUMBER = 75
+LO_BITS = 63  # Numbers 1..63 live in the low column, 64..75 in the high one; both stay positive
+LO_MASK = (1 << LO_BITS) - 1
+
+
+def number_bit(number: int) -> int:
+    if not 1 <= number <= MAX_NUMBER:
+        raise ValueError(f"Bingo numbers run from 1 to {MAX_NUMBER}, got {number}")
+    return 1 << (number - 1)
+
+
+def column_bit(number: int) -> Tuple[str, int]:
+    # ("lo" | "hi", bit) for building SQL predicates against one column
+    bit = number_bit(number)
+    return ("lo", bit) if number <= LO_BITS else ("hi", bit >> LO_BITS)
+
+
+def from_numbers(numbers: Iterable[int]) -> int:
+    mask = 0
+    for number in numbers:
+        mask |= number_bit(number)
+    return mask
+
+
+def to_numbers(mask: int) -> List[int]:
+    numbers = []
+    while mask:
+        low = mask & -mask
+        numbers.append(low.bit_length())
+        mask ^= low
+    return numbers
+
+
+def split(mask: int) -> Tuple[int, int]:
+    return mask & LO_MASK, mask >> LO_BITS
+
+
+def join(lo: int, hi: int) -> int:
+    return (lo or 0) | ((hi or 0) << LO_BITS)
+
+
+def pack_sequence(numbers: Iterable[int]) -> bytes:
+    # One byte per call, in call order
+    numbers = list(numbers)
+    for number in numbers:
+        number_bit(number)
+    return bytes(numbers)
+
+
+def unpack_sequence(data: bytes) -> List[int]:
+    return list(data or b"")
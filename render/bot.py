@@ -8,15 +8,18 @@ import nest_asyncio
 import asyncio
 from telegram import (
     Update, InlineKeyboardButton, InlineKeyboardMarkup,
-    WebAppInfo, InputFile, BotCommand
+    WebAppInfo, BotCommand
 )
 from telegram.ext import (
-    Application, CommandHandler, CallbackQueryHandler,
+    Application, CommandHandler,
     MessageHandler, ContextTypes, filters
 )
 from flask import Flask
-from models import db, User, Game, GameParticipant, Transaction, ScheduledGame
-from sqlalchemy import func
+from database import init_db
+from bot_db import BotDB, timed_handler, fetch_balance, top_players, submit_deposit, submit_withdrawal
+from user_cache import user_cache
+from audio_catalogue import audio_catalogue
+from leaderboard import WINDOWS
 from utils import get_lang, referral_link, is_valid_tx_id
 import game
 
@@ -34,8 +37,9 @@ ADMIN_IDS = [123456789]  # Example: [7247278760]
 
 # Flask app
 flask_app = Flask(__name__)
-flask_app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///bingo.db")
-db.init_app(flask_app)
+init_db(flask_app)
+# Handlers await their queries here instead of blocking the event loop
+bot_db = BotDB(flask_app)
 
 # Telegram bot app
 telegram_app = Application.builder().token(TOKEN).build()
@@ -72,16 +76,36 @@ async def withdraw(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(lang["withdraw"])
 
 
+@timed_handler
 async def balance(update: Update, context: ContextTypes.DEFAULT_TYPE):
     telegram_id = str(update.effective_user.id)
-    user = User.query.filter_by(telegram_id=telegram_id).first()
+    user = await bot_db.user(telegram_id)
     if user:
         lang = get_lang(context)
-        await update.message.reply_text(f"{lang['balance']}: {user.balance} birr")
+        amount = await bot_db.run(fetch_balance, user.id)
+        await update.message.reply_text(f"{lang['balance']}: {amount} birr")
     else:
         await update.message.reply_text("❌ You must start the bot first using /start.")
 
 
+@timed_handler
+async def leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # /leaderboard [daily|weekly|all]
+    window = context.args[0].lower() if context.args else "all"
+    if window not in WINDOWS:
+        await update.message.reply_text(f"❌ Choose one of: {', '.join(WINDOWS)}")
+        return
+    rows = await bot_db.run(top_players, window)
+    if not rows:
+        await update.message.reply_text("🏆 No winners yet.")
+        return
+    lines = [
+        f"{rank}. {row['username'] or 'Player'} — {row['wins']} wins, {row['earnings']:.2f} birr"
+        for rank, row in enumerate(rows, start=1)
+    ]
+    await update.message.reply_text(f"🏆 Leaderboard ({window})\n" + "\n".join(lines))
+
+
 async def referral_contest(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = get_lang(context)
     telegram_id = str(update.effective_user.id)
@@ -122,13 +146,10 @@ async def play_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def call_number(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    result = game.call_number(chat_id=update.effective_chat.id, context=context)
+    result = game.draw(chat_id=update.effective_chat.id, context=context)
     if result:
+        # call_number already queued the voice clip
         await context.bot.send_message(chat_id=update.effective_chat.id, text=f"🎱 {result['formatted']}")
-        try:
-            await context.bot.send_voice(chat_id=update.effective_chat.id, voice=InputFile("audio/number_call_am.ogg"))
-        except Exception:
-            pass
     else:
         await context.bot.send_message(chat_id=update.effective_chat.id, text="✅ Game finished!")
 
@@ -136,6 +157,7 @@ async def call_number(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # 💬 HANDLE USER INPUT
 # ============================================================
 
+@timed_handler
 async def handle_user_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.effective_user or not update.message:
         return
@@ -143,58 +165,50 @@ async def handle_user_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     telegram_id = str(update.effective_user.id)
     text = update.message.text.strip()
 
-    with flask_app.app_context():
-        user = User.query.filter_by(telegram_id=telegram_id).first()
-        if not user:
-            await update.message.reply_text("❌ You must start the bot first using /start.")
-            return
+    user = await bot_db.user(telegram_id)
+    if not user:
+        await update.message.reply_text("❌ You must start the bot first using /start.")
+        return
 
-        # ✅ Edit cartela
-        if text.startswith("edit:"):
-            new_cartela = text.replace("edit:", "").strip()
-            user.cartela = new_cartela
-            db.session.commit()
-            await update.message.reply_text("✅ Cartela updated.")
-            return
+    # ✏️ Edit cartela — not supported: cartelas are picked per game, nothing is stored on the user
+    if text.startswith("edit:"):
+        await update.message.reply_text("ℹ️ Cartelas can't be edited here. Pick your cartela when you join a game.")
+        return
 
-        # 💰 Handle deposit
-        if context.chat_data.get("deposit_method"):
-            method = context.chat_data["deposit_method"]
-            if not is_valid_tx_id(text):
-                await update.message.reply_text("❌ Invalid transaction ID. Please try again.")
-                return
-
-            tx = Transaction(
-                user_id=user.id,
-                type="deposit",
-                amount=0,
-                method=method,
-                status="pending",
-                reference=text
-            )
-            db.session.add(tx)
-            db.session.commit()
-            await update.message.reply_text("✅ Transaction received. Awaiting admin approval.")
+    # 💰 Handle deposit
+    if context.chat_data.get("deposit_method"):
+        method = context.chat_data["deposit_method"]
+        if not is_valid_tx_id(text):
+            await update.message.reply_text("❌ Invalid transaction ID. Please try again.")
             return
 
-        # 💸 Handle withdrawal
-        try:
-            amount = int(text)
-            if amount <= 0 or amount > user.balance:
-                await update.message.reply_text("❌ Invalid amount or insufficient balance.")
-                return
-
-            tx = Transaction(
-                user_id=user.id,
-                type="withdraw",
-                amount=amount,
-                status="pending"
-            )
-            db.session.add(tx)
-            db.session.commit()
-            await update.message.reply_text(f"✅ Withdrawal request for {amount} birr submitted.")
-        except ValueError:
-            await update.message.reply_text("❌ Please enter a valid number.")
+        await bot_db.run(submit_deposit, user.id, method, text)
+        await update.message.reply_text("✅ Transaction received. Awaiting admin approval.")
+        return
+
+    # 💸 Handle withdrawal
+    try:
+        amount = int(text)
+    except ValueError:
+        await update.message.reply_text("❌ Please enter a valid number.")
+        return
+
+    # submit_withdrawal checks the amount against the stored balance
+    if amount <= 0 or not await bot_db.run(submit_withdrawal, user.id, amount):
+        await update.message.reply_text("❌ Invalid amount or insufficient balance.")
+        return
+    await update.message.reply_text(f"✅ Withdrawal request for {amount} birr submitted.")
+
+
+async def cache_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id not in ADMIN_IDS:
+        return
+    stats = user_cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = stats["hits"] / lookups * 100 if lookups else 0
+    await update.message.reply_text(
+        f"👤 User cache: {stats['size']} entries, {stats['hits']} hits, {stats['misses']} misses ({hit_rate:.0f}% hit rate)"
+    )
 
 
 # ============================================================
@@ -216,11 +230,13 @@ async def main():
     telegram_app.add_handler(CommandHandler("deposit", deposit))
     telegram_app.add_handler(CommandHandler("withdraw", withdraw))
     telegram_app.add_handler(CommandHandler("balance", balance))
+    telegram_app.add_handler(CommandHandler("leaderboard", leaderboard))
     telegram_app.add_handler(CommandHandler("referral_contest", referral_contest))
     telegram_app.add_handler(CommandHandler("invite", invite))
     telegram_app.add_handler(CommandHandler("language", language))
     telegram_app.add_handler(CommandHandler("play", play_game))
     telegram_app.add_handler(CommandHandler("call", call_number))
+    telegram_app.add_handler(CommandHandler("cachestats", cache_stats))
 
     telegram_app.add_handler(MessageHandler(filters.TEXT, handle_user_input))
     telegram_app.add_error_handler(error_handler)
@@ -228,6 +244,7 @@ async def main():
     logging.info("✅ Arada Bingo Ethiopia bot is starting...")
 
     flask_app.app_context().push()
+    logging.info(f"🎙️ Preloaded {audio_catalogue.preload()} voice clips")
 
     # 🧩 Telegram commands
     commands = [
@@ -235,6 +252,7 @@ async def main():
         BotCommand("play", "Play Bingo"),
         BotCommand("withdraw", "Withdraw balance"),
         BotCommand("balance", "Check balance"),
+        BotCommand("leaderboard", "Top players"),
         BotCommand("deposit", "Deposit funds"),
         BotCommand("language", "Choose language"),
         BotCommand("invite", "Invite friends to play Bingo")
@@ -0,0 +1,108 @@
+# bot_db.py — database access for the async bot handlers
+#
+# Handlers never touch the session on the event loop. They await BotDB.run(fn, ...), which runs
+# fn in a bounded thread pool inside its own app context, so every call gets its own scoped
+# session (removed when the context pops) and a slow query only holds up its own update.
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from config import BOT_DB_WORKERS, BOT_DB_MAX_PENDING
+from database import track_queries
+from models import db, User, Transaction
+from user_cache import user_cache, UserSnapshot
+from leaderboard import leaderboards
+
+T = TypeVar("T")
+
+
+class BotDB:
+    def __init__(self, app, workers: int = BOT_DB_WORKERS, max_pending: int = BOT_DB_MAX_PENDING):
+        self.app = app
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bot-db")
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        # Past max_pending queued calls, handlers wait here instead of piling work on the pool
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers + self.max_pending)
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            # Copy the context so queries count towards the calling handler's track_queries()
+            call = functools.partial(contextvars.copy_context().run, self._call, fn, args, kwargs)
+            return await loop.run_in_executor(self._executor, call)
+
+    def _call(self, fn: Callable[..., T], args, kwargs) -> T:
+        with self.app.app_context():
+            return fn(*args, **kwargs)
+
+    async def user(self, telegram_id) -> Optional[UserSnapshot]:
+        # Served from the user cache on the loop; only misses go to the pool
+        snapshot = user_cache.peek(telegram_id)
+        if snapshot is None:
+            snapshot = await self.run(user_cache.load, telegram_id)
+        return snapshot
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+def timed_handler(handler):
+    # Logs wall time, query count and DB time for every update a handler processes
+    @functools.wraps(handler)
+    async def wrapper(update, context, *args, **kwargs):
+        started = time.perf_counter()
+        with track_queries(f"bot {handler.__name__}", log=False) as stats:
+            try:
+                return await handler(update, context, *args, **kwargs)
+            finally:
+                elapsed = (time.perf_counter() - started) * 1000
+                logging.info(
+                    f"⏱️ {handler.__name__}: {elapsed:.1f} ms, {stats.count} queries, {stats.seconds * 1000:.1f} ms in DB"
+                )
+    return wrapper
+
+
+# -------------------- QUERIES (run inside BotDB.run) --------------------
+
+def fetch_balance(user_id: int):
+    # Always from the database; balances are not cached (see user_cache.py)
+    return db.session.execute(db.select(User.balance).filter_by(id=user_id)).scalar()
+
+
+def top_players(window: str = "all"):
+    # This process's board reloads from the ledger every LEADERBOARD_TTL; only the web app feeds it wins
+    return leaderboards.top(window)
+
+
+def submit_deposit(user_id: int, method: str, reference: str):
+    db.session.add(Transaction(
+        user_id=user_id,
+        type="deposit",
+        amount=0,
+        method=method,
+        status="pending",
+        reference=reference
+    ))
+    db.session.commit()
+
+
+def submit_withdrawal(user_id: int, amount: int) -> bool:
+    # False when the amount is not covered; the debit itself happens on admin approval
+    balance = db.session.execute(db.select(User.balance).filter_by(id=user_id)).scalar()
+    if balance is None or amount > balance:
+        return False
+    db.session.add(Transaction(
+        user_id=user_id,
+        type="withdraw",
+        amount=amount,
+        status="pending"
+    ))
+    db.session.commit()
+    return True
@@ -0,0 +1,196 @@
+# broadcast.py — announces every draw to every participant of a room
+#
+# Attached to the registry like the persister: each "call" event fans out to the players who have
+# sound (voice clip, captioned with the number) or text announcements enabled. The sends run on
+# the outbox loop and share its bot and token bucket, at most BROADCAST_CONCURRENCY at a time,
+# each cut off after BROADCAST_SEND_TIMEOUT. Nothing here ever delays the draw itself:
+#   - a chat whose previous announcement is still in flight is skipped (slow),
+#   - a chat that blocked the bot is skipped for BROADCAST_BLOCKED_TTL seconds,
+#   - sends still waiting when the next draw of the room is announced are dropped (superseded),
+#   - sends that cannot finish within the room's call_interval are dropped (expired).
+# With Telegram's default ~30 messages/s per bot, a draw reaches about 30 × call_interval chats;
+# larger rooms need a higher OUTBOX_RATE (paid broadcasts allow up to 1000/s).
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram.error import Forbidden, RetryAfter, TelegramError
+
+from audio_catalogue import audio_catalogue
+from cache import TTLCache
+from config import BROADCAST_CONCURRENCY, BROADCAST_SEND_TIMEOUT, BROADCAST_BLOCKED_TTL
+from game_logic import BingoGame
+from outbox import Outbox, outbox as default_outbox
+from registry import GameRegistry
+
+OUTCOMES = ("sent", "slow", "blocked", "superseded", "expired", "flood", "failed")
+
+
+class Broadcaster:
+    def __init__(self, outbox: Optional[Outbox] = None, concurrency: int = BROADCAST_CONCURRENCY,
+                 send_timeout: float = BROADCAST_SEND_TIMEOUT, blocked_ttl: float = BROADCAST_BLOCKED_TTL):
+        self.outbox = outbox or default_outbox
+        self.concurrency = concurrency
+        self.send_timeout = send_timeout
+        self._blocked = TTLCache(maxsize=100000, ttl=blocked_ttl)
+        # Loop-only state
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._sending: set = set()  # chats with an API call in progress
+        self._latest: Dict[int, int] = {}  # game id -> event seq of its latest draw
+        self._fanouts: set = set()  # fan-out tasks still running, cancelled by close()
+
+        self._lock = threading.Lock()
+        self.draws = 0
+        self.totals = {outcome: 0 for outcome in OUTCOMES}
+        self._fanout: deque = deque(maxlen=1000)  # Seconds from draw to the last delivered send
+        self._send_latency: deque = deque(maxlen=5000)  # Seconds per delivered send
+        self.last_draw: Dict[str, Any] = {}
+
+    def attach(self, registry: GameRegistry):
+        registry.add_listeners.append(self.track)
+        atexit.register(self.close)
+
+    def close(self, timeout: float = 1.0):
+        # Cancels announcements still going out and waits for them to unwind; safe to call twice
+        if not self._fanouts:
+            return
+        future = self.outbox.submit(self._cancel_fanouts())
+        if future is None:
+            return
+        try:
+            future.result(timeout)
+        except Exception:
+            logging.warning("⚠️ Broadcasts did not finish cancelling before shutdown")
+
+    def track(self, game: BingoGame):
+        game.events.subscribers.append(lambda event: self._on_event(game, event))
+
+    def _on_event(self, game: BingoGame, event):
+        # Runs in the drawing thread under the game lock: snapshot the recipients and hand off
+        if event.type != "call":
+            return
+        recipients = [(entry.user_id, entry.sound) for entry in game.players.values() if entry.sound or entry.notify]
+        if not recipients:
+            return
+        drawn_at = time.monotonic()
+        self.outbox.submit(self._fan_out(
+            game.game_id, event.seq, event.data["number"], event.data["formatted"],
+            recipients, drawn_at, drawn_at + game.call_interval
+        ))
+
+    # -------------------- OUTBOX LOOP --------------------
+
+    async def _cancel_fanouts(self):
+        tasks = list(self._fanouts)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _fan_out(self, game_id: int, seq: int, number: int, formatted: str,
+                       recipients: List[Tuple[int, bool]], drawn_at: float, deadline: float):
+        task = asyncio.current_task()
+        self._fanouts.add(task)
+        try:
+            await self._announce(game_id, seq, number, formatted, recipients, drawn_at, deadline)
+        finally:
+            self._fanouts.discard(task)
+
+    async def _announce(self, game_id: int, seq: int, number: int, formatted: str,
+                        recipients: List[Tuple[int, bool]], drawn_at: float, deadline: float):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        self._latest[game_id] = seq
+        text = f"🎱 {formatted}"
+        clip = audio_catalogue.clip(number)
+        results = await asyncio.gather(*(
+            self._send(game_id, seq, chat_id, text, clip if sound else None, deadline)
+            for chat_id, sound in recipients
+        ))
+
+        counts = {outcome: 0 for outcome in OUTCOMES}
+        finished = drawn_at
+        for outcome, done_at in results:
+            counts[outcome] += 1
+            if outcome == "sent":
+                finished = max(finished, done_at)
+        fanout = finished - drawn_at
+        with self._lock:
+            self.draws += 1
+            for outcome, count in counts.items():
+                self.totals[outcome] += count
+            if counts["sent"]:
+                self._fanout.append(fanout)
+            self.last_draw = {"game_id": game_id, "number": number, "recipients": len(recipients),
+                              "fanout_ms": round(fanout * 1000, 1), **counts}
+        if counts["sent"] < len(recipients):
+            logging.info(f"📣 Game {game_id} {formatted}: {counts['sent']}/{len(recipients)} announced "
+                         f"in {fanout * 1000:.0f} ms ({', '.join(f'{k} {v}' for k, v in counts.items() if v and k != 'sent')})")
+        if self._latest.get(game_id) == seq:
+            del self._latest[game_id]
+
+    async def _send(self, game_id: int, seq: int, chat_id: int, text: str, clip: Any,
+                    deadline: float) -> Tuple[str, float]:
+        if self._blocked.get(chat_id):
+            return "blocked", 0.0
+        if chat_id in self._sending:
+            return "slow", 0.0
+        async with self._slots:
+            try:
+                await asyncio.wait_for(self.outbox.bucket.acquire(), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                return "expired", 0.0
+            if self._latest.get(game_id, seq) != seq:
+                return "superseded", 0.0
+            if chat_id in self._sending:
+                return "slow", 0.0
+            self._sending.add(chat_id)
+            started = time.monotonic()
+            # Cut off at the deadline too, so the announcement never runs into the next draw
+            timeout = min(self.send_timeout, deadline - started)
+            try:
+                if clip is not None:
+                    send = clip.deliver(self.outbox.bot, chat_id, caption=text)
+                else:
+                    send = self.outbox.bot.send_message(chat_id=chat_id, text=text)
+                await asyncio.wait_for(send, timeout)
+            except asyncio.TimeoutError:
+                return ("slow" if timeout == self.send_timeout else "expired"), 0.0
+            except RetryAfter as e:
+                self.outbox.bucket.pause(float(e.retry_after))
+                return "flood", 0.0
+            except Forbidden:
+                self._blocked.set(chat_id, True)
+                return "blocked", 0.0
+            except TelegramError as e:
+                logging.debug(f"Announcement to {chat_id} failed: {e}")
+                return "failed", 0.0
+            finally:
+                self._sending.discard(chat_id)
+        done = time.monotonic()
+        with self._lock:
+            self._send_latency.append(done - started)
+        return "sent", done
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            fanout = sorted(self._fanout)
+            sends = sorted(self._send_latency)
+            last = dict(self.last_draw)
+
+            def pct(values: List[float], p: float) -> float:
+                return round(values[min(len(values) - 1, int(p * len(values)))] * 1000, 1) if values else 0
+
+            return {
+                "draws": self.draws,
+                "announcements": dict(self.totals),
+                "fanout_ms": {"p50": pct(fanout, 0.50), "p99": pct(fanout, 0.99), "max": pct(fanout, 1.0)},
+                "send_ms": {"p50": pct(sends, 0.50), "p99": pct(sends, 0.99)},
+                "last_draw": last,
+            }
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,132 @@
+# cartelas.py
+import os
+import random
+import sys
+from array import array
+from typing import FrozenSet, Optional, Tuple
+
+from config import CARTELA_SIZE, CARTELA_CATALOGUE_FILE
+
+CELLS = 25
+COLUMN_STARTS = (1, 16, 31, 46, 61)  # B, I, N, G, O
+
+
+def build_cartela(cartela_number: int) -> Tuple[int, ...]:
+    # A private RNG seeded like the old random.seed(cartela_number) gives identical boards
+    rng = random.Random(cartela_number)
+    columns = [rng.sample(range(start, start + 15), 5) for start in COLUMN_STARTS]
+    return tuple(columns[col][row] for row in range(5) for col in range(5))
+
+
+class CartelaCatalogue:
+    # All boards packed row-major, one byte per cell, 25 bytes per cartela (cartela n at (n-1)*25)
+
+    def __init__(self, data: bytes):
+        if len(data) % CELLS:
+            raise ValueError("Catalogue data must be a multiple of 25 bytes")
+        self._data = bytes(data)
+        self.size = len(self._data) // CELLS
+
+    @classmethod
+    def generate(cls, size: int) -> "CartelaCatalogue":
+        data = bytearray(size * CELLS)
+        for n in range(1, size + 1):
+            data[(n - 1) * CELLS:n * CELLS] = build_cartela(n)
+        return cls(data)
+
+    @classmethod
+    def load(cls, path: str, size: Optional[int] = None) -> "CartelaCatalogue":
+        with open(path, "rb") as f:
+            return cls(f.read(size * CELLS if size else -1))
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self._data)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, cartela_number: int) -> bool:
+        return 1 <= cartela_number <= self.size
+
+    def board(self, cartela_number: int) -> Tuple[int, ...]:
+        return tuple(self.board_bytes(cartela_number))
+
+    def board_bytes(self, cartela_number: int) -> bytes:
+        if cartela_number in self:
+            offset = (cartela_number - 1) * CELLS
+            return self._data[offset:offset + CELLS]
+        return bytes(build_cartela(cartela_number))
+
+
+class CartelaPool:
+    # Free cartela numbers of one game: a dense free list plus each number's slot in it
+    # (-1 once taken), so reserve, release and random pick are all O(1)
+
+    def __init__(self, size: int):
+        self.size = size
+        self._free = array("i", range(1, size + 1))
+        self._pos = array("i", range(-1, size))
+        self._snapshot: Optional[FrozenSet[int]] = None
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def is_free(self, cartela_number: int) -> bool:
+        return self.valid(cartela_number) and self._pos[cartela_number] >= 0
+
+    def valid(self, cartela_number: int) -> bool:
+        return type(cartela_number) is int and 1 <= cartela_number <= self.size
+
+    def reserve(self, cartela_number: int) -> bool:
+        if not self.is_free(cartela_number):
+            return False
+        slot = self._pos[cartela_number]
+        last = self._free.pop()
+        if last != cartela_number:
+            self._free[slot] = last
+            self._pos[last] = slot
+        self._pos[cartela_number] = -1
+        self._snapshot = None
+        return True
+
+    def release(self, cartela_number: int) -> bool:
+        if not self.valid(cartela_number) or self._pos[cartela_number] >= 0:
+            return False
+        self._pos[cartela_number] = len(self._free)
+        self._free.append(cartela_number)
+        self._snapshot = None
+        return True
+
+    def pick(self, rng: random.Random) -> Optional[int]:
+        if not self._free:
+            return None
+        cartela_number = self._free[rng.randrange(len(self._free))]
+        self.reserve(cartela_number)
+        return cartela_number
+
+    def available(self) -> FrozenSet[int]:
+        # Rebuilt at most once per change, however many viewers ask
+        if self._snapshot is None:
+            self._snapshot = frozenset(self._free)
+        return self._snapshot
+
+
+def load_catalogue(size: int = CARTELA_SIZE, path: Optional[str] = CARTELA_CATALOGUE_FILE) -> CartelaCatalogue:
+    if path and os.path.exists(path):
+        catalogue = CartelaCatalogue.load(path, size)
+        if len(catalogue) == size:
+            return catalogue
+    return CartelaCatalogue.generate(size)
+
+
+# 🎫 Shared, read-only catalogue for every game in this process
+CATALOGUE = load_catalogue()
+
+
+if __name__ == "__main__":
+    # Usage: python cartelas.py <output file> [size]
+    out_path = sys.argv[1]
+    out_size = int(sys.argv[2]) if len(sys.argv) > 2 else CARTELA_SIZE
+    CartelaCatalogue.generate(out_size).save(out_path)
+    print(f"✅ Wrote {out_size} cartelas to {out_path}")
@@ -11,11 +11,23 @@ ADMIN_IDS = [int(id.strip()) for id in os.getenv("ADMIN_IDS", "").split(",") if
 
 # 🎮 Game Settings
 CARTELA_SIZE = int(os.getenv("CARTELA_SIZE", 100))  # Total numbers in Bingo
+CARTELA_CATALOGUE_FILE = os.getenv("CARTELA_CATALOGUE_FILE")  # Optional packed catalogue (see cartelas.py)
 MIN_PLAYERS = int(os.getenv("MIN_PLAYERS", 2))
 GAME_PRICES = [10, 20, 30, 50, 100]  # ETB options
 MIN_GAMES_FOR_WITHDRAWAL = int(os.getenv("MIN_GAMES_FOR_WITHDRAWAL", 5))
 MIN_WINS_FOR_WITHDRAWAL = int(os.getenv("MIN_WINS_FOR_WITHDRAWAL", 1))
 REFERRAL_BONUS = int(os.getenv("REFERRAL_BONUS", 20))  # ETB bonus
+MAX_LIVE_GAMES = int(os.getenv("MAX_LIVE_GAMES", 500))  # Waiting + active rooms per worker
+FINISHED_GAME_TTL = int(os.getenv("FINISHED_GAME_TTL", 600))  # Seconds a finished room stays in memory
+MAX_FINISHED_GAMES = int(os.getenv("MAX_FINISHED_GAMES", 1000))
+WAITING_GAME_TTL = int(os.getenv("WAITING_GAME_TTL", 1800))  # Seconds a waiting room may go without a join or leave
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", 10))
+LEADERBOARD_TTL = int(os.getenv("LEADERBOARD_TTL", 300))  # Seconds before a window is re-read from SQL
+PERSIST_INTERVAL_MS = int(os.getenv("PERSIST_INTERVAL_MS", 500))  # Max age of unsaved game state
+PERSIST_MAX_EVENTS = int(os.getenv("PERSIST_MAX_EVENTS", 200))  # ...or flush early after this many events
+METRICS_PROFILE_RATE = float(os.getenv("METRICS_PROFILE_RATE", 0))  # Share of requests to profile; 0 disables
+METRICS_PROFILE_DIR = os.getenv("METRICS_PROFILE_DIR", "profiles")
+METRICS_PROFILE_KEEP = int(os.getenv("METRICS_PROFILE_KEEP", 20))  # Slowest profiles kept on disk
 
 # 🛡️ Admin Panel Credentials
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
@@ -25,6 +37,30 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 # 🧠 Database Configuration
 SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))  # Seconds to wait for a pooled connection (SQLite: for the write lock)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 300))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))  # PostgreSQL only; 0 disables
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 200))
+DB_QUERY_WARN_COUNT = int(os.getenv("DB_QUERY_WARN_COUNT", 25))  # Queries per request/update before warning
+BOT_DB_WORKERS = int(os.getenv("BOT_DB_WORKERS", 4))  # Threads running the bot's database calls
+BOT_DB_MAX_PENDING = int(os.getenv("BOT_DB_MAX_PENDING", 100))  # Queued calls before handlers wait for a slot
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 30))  # Seconds; bounds staleness from writes in other processes
+OUTBOX_RATE = float(os.getenv("OUTBOX_RATE", 25))  # Messages/s across all chats; Telegram's bot limit is ~30
+OUTBOX_CHAT_INTERVAL = float(os.getenv("OUTBOX_CHAT_INTERVAL", 1.0))  # Seconds between messages to one chat
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", 8))  # Concurrent sends, so one slow call does not stall the rest
+OUTBOX_MAX_RETRIES = int(os.getenv("OUTBOX_MAX_RETRIES", 5))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", 50))  # Draw announcements in flight at once
+BROADCAST_SEND_TIMEOUT = float(os.getenv("BROADCAST_SEND_TIMEOUT", 2.0))  # Seconds before a chat counts as slow
+BROADCAST_BLOCKED_TTL = int(os.getenv("BROADCAST_BLOCKED_TTL", 3600))  # Seconds to skip a chat that blocked the bot
+AUDIO_DIR = os.getenv("AUDIO_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio"))
+AUDIO_DEFAULT_PACK = os.getenv("AUDIO_DEFAULT_PACK", "amharic")
+# Telegram file_ids of uploaded clips, shared by every process on the host (bot and web workers)
+AUDIO_FILE_IDS_FILE = os.path.abspath(os.getenv(
+    "AUDIO_FILE_IDS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio_file_ids.json")
+))
 
 # 🌐 Flask Server Configuration
 FLASK_HOST = os.getenv("FLASK_HOST", "0.0.0.0")
@@ -1,30 +1,159 @@
+import logging
 import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from flask import g
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import DeclarativeBase
 
+from config import (
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_STATEMENT_TIMEOUT_MS,
+    DB_SLOW_QUERY_MS, DB_QUERY_WARN_COUNT
+)
+
+DEFAULT_DATABASE_URL = "sqlite:///arada.db"
+
 class Base(DeclarativeBase):
     pass
 
+# The one SQLAlchemy instance shared by models.py, app.py and bot.py
 db = SQLAlchemy(model_class=Base)
 
-def init_db(app):
+# -------------------- ENGINE FACTORY --------------------
+
+def engine_options(db_uri: str) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"pool_pre_ping": True}
+    if db_uri.startswith("sqlite"):
+        # Connections are opened per thread; the scheduler, persister and request threads share the file
+        options["connect_args"] = {"check_same_thread": False, "timeout": DB_POOL_TIMEOUT}
+        return options
+
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if db_uri.startswith("postgres") and DB_STATEMENT_TIMEOUT_MS:
+        options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+def init_db(app, default_uri: str = DEFAULT_DATABASE_URL):
     db_uri = os.environ.get("DATABASE_URL")
     if not db_uri:
-        raise RuntimeError("DATABASE_URL environment variable not set.")
+        logging.warning(f"⚠️ DATABASE_URL not set, using {default_uri}")
+        db_uri = default_uri
+    elif db_uri.startswith("postgres://"):
+        db_uri = db_uri.replace("postgres://", "postgresql://", 1)
 
-    print(f"Connecting to database: {db_uri}")
+    print(f"Connecting to database: {db_uri.split('@')[-1]}")
 
     app.config["SQLALCHEMY_DATABASE_URI"] = db_uri
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-        "pool_recycle": 300,
-        "pool_pre_ping": True,
-    }
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(db_uri)
 
     db.init_app(app)
+    app.before_request(_start_request_stats)
+    app.teardown_request(_finish_request_stats)
 
     with app.app_context():
+        instrument(db.engine)
         import models
         db.create_all()
 
-__all__ = ["db", "Base"]
+# -------------------- QUERY INSTRUMENTATION --------------------
+
+class QueryStats:
+    __slots__ = ("label", "count", "seconds")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.count = 0
+        self.seconds = 0.0
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+@contextmanager
+def track_queries(label: str, log: bool = True) -> Iterator[QueryStats]:
+    # Counts queries and DB time for one unit of work (a request, a bot update) and logs the total
+    stats = QueryStats(label)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        if log:
+            _log_stats(stats)
+
+def _log_stats(stats: QueryStats):
+    if not stats.count:
+        return
+    message = f"🗄️ {stats.label}: {stats.count} queries, {stats.seconds * 1000:.1f} ms in DB"
+    if stats.count >= DB_QUERY_WARN_COUNT:
+        logging.warning(f"{message} (possible N+1)")
+    else:
+        logging.info(message)
+
+def _start_request_stats():
+    from flask import request
+    stats = QueryStats(f"{request.method} {request.path}")
+    g._query_stats_token = _current_stats.set(stats)
+    g.query_stats = stats
+
+def _finish_request_stats(exc=None):
+    token = g.pop("_query_stats_token", None)
+    if token is not None:
+        _current_stats.reset(token)
+        _log_stats(g.query_stats)
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+    if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+        label = f" [{stats.label}]" if stats else ""
+        logging.warning(f"🐢 Slow query{label} {elapsed * 1000:.1f} ms: {' '.join(statement.split())[:500]}")
+
+def _check_pool(pool):
+    # Runs on every checkout; the next request past this point waits up to DB_POOL_TIMEOUT
+    if pool.checkedout() >= DB_POOL_SIZE + DB_MAX_OVERFLOW:
+        stats = _current_stats.get()
+        label = f" [{stats.label}]" if stats else ""
+        logging.warning(f"🚰 Connection pool exhausted{label}: {pool.status()}")
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the single writer; NORMAL is durable across app crashes in WAL mode
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+def instrument(engine: Engine):
+    if getattr(engine, "_arada_instrumented", False):
+        return
+    engine._arada_instrumented = True
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", _after_execute)
+    if engine.dialect.name != "sqlite":
+        event.listen(engine, "checkout", lambda *args: _check_pool(engine.pool))
+    else:
+        event.listen(engine, "connect", _sqlite_pragmas)
+        engine.dispose()  # Reconnect so every pooled connection gets the pragmas
+
+def pool_status() -> str:
+    return db.engine.pool.status()
+
+__all__ = ["db", "Base", "init_db", "track_queries", "current_query_stats", "pool_status"]
@@ -0,0 +1,46 @@
+# events.py
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+
+class GameEvent(NamedTuple):
+    seq: int
+    type: str
+    data: Dict[str, Any]
+
+
+class GameEventLog:
+    # Bounded, ordered log of one game's public events; streamers block in wait() until something new lands
+
+    def __init__(self, maxlen: int = 256):
+        self._events: deque = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self.seq = 0
+        # Called with each new event after it is logged, e.g. to mark the game dirty for persistence
+        self.subscribers: List[Callable[[GameEvent], None]] = []
+
+    def publish(self, type: str, data: Dict[str, Any]) -> int:
+        with self._cond:
+            self.seq += 1
+            event = GameEvent(self.seq, type, data)
+            self._events.append(event)
+            self._cond.notify_all()
+        for subscriber in self.subscribers:
+            subscriber(event)
+        return event.seq
+
+    def since(self, seq: int) -> Tuple[List[GameEvent], bool]:
+        # Returns the events after seq, and False when some of them already fell out of the log.
+        # A seq ahead of the log (a client of an earlier run of this game id) is incomplete too.
+        with self._cond:
+            if seq >= self.seq:
+                return [], seq == self.seq
+            oldest = self._events[0].seq if self._events else self.seq + 1
+            complete = seq >= oldest - 1
+            return [event for event in self._events if event.seq > seq], complete
+
+    def wait(self, seq: int, timeout: float) -> Tuple[List[GameEvent], bool]:
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > seq, timeout)
+            return self.since(seq)
@@ -1,28 +1,122 @@
 import random
 import threading
 import logging
+import hashlib
+import secrets
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple, Any
-from telegram import InputFile
-import os
-
-def play_bingo_audio(chat_id: int, number: int, context: Any):
-    filename = BingoGame.format_number(number).lower().replace("-", "") + ".ogg"
-    path = os.path.join("audio", "bingo", filename)
-    try:
-        context.bot.send_voice(chat_id=chat_id, voice=InputFile(path))
-    except Exception as e:
-        context.bot.send_message(chat_id=chat_id, text=f"🎙️ Audio for {number} not found.")
+from array import array
+from typing import List, Dict, Optional, Tuple, Any, Callable
+from cartelas import CATALOGUE, CartelaCatalogue, CartelaPool
+from scheduler import call_scheduler
+from events import GameEventLog
+from leaderboard import TopN
+from outbox import outbox
+from audio_catalogue import audio_catalogue
+
+MAX_CARTELAS = 5  # per player per game
+
+# 🎯 Win patterns as 25-bit masks over board cells (row-major, FREE cell at 12)
+FREE_CELL = 12
+
+def _cells_mask(cells) -> int:
+    mask = 0
+    for cell in cells:
+        mask |= 1 << cell
+    return mask
+
+ROW_MASKS = tuple(_cells_mask(range(r * 5, r * 5 + 5)) for r in range(5))
+COLUMN_MASKS = tuple(_cells_mask(range(c, 25, 5)) for c in range(5))
+DIAGONAL_MASKS = (_cells_mask([0, 6, 12, 18, 24]), _cells_mask([4, 8, 12, 16, 20]))
+CORNER_MASKS = (_cells_mask([0, 4, 20, 24]),)
+
+# Checked in this order, so the reported pattern matches the old scan order
+WIN_PATTERNS = (
+    ("Winner - Row complete!", ROW_MASKS),
+    ("Winner - Column complete!", COLUMN_MASKS),
+    ("Winner - Diagonal complete!", DIAGONAL_MASKS),
+    ("Winner - Corner complete!", CORNER_MASKS),
+)
+
+def winning_pattern(mask: int) -> Optional[str]:
+    for message, patterns in WIN_PATTERNS:
+        for pattern in patterns:
+            if mask & pattern == pattern:
+                return message
+    return None
+
+# Patterns through each cell: marking a cell can only complete one of these
+CELL_PATTERNS = tuple(
+    tuple((message, pattern) for message, patterns in WIN_PATTERNS for pattern in patterns if pattern >> cell & 1)
+    for cell in range(25)
+)
+
+# number_index entries pack a cartela slot and its cell into one int
+CELL_BITS = 5
+CELL_FIELD = (1 << CELL_BITS) - 1
+
+class Cartela:
+    __slots__ = ("owner", "number", "board", "mask")
+
+    def __init__(self, owner: int, number: int, board: bytes):
+        self.owner = owner
+        self.number = number
+        self.board = board  # 25 cells, row-major, one byte each
+        self.mask = 1 << FREE_CELL
+
+    def cell_of(self, number: int) -> int:
+        return self.board.find(number)
+
+    def numbers(self) -> Tuple[int, ...]:
+        return tuple(self.board)
+
+    def marked(self) -> List[int]:
+        mask = self.mask
+        return sorted(n for cell, n in enumerate(self.board) if mask >> cell & 1)
+
+class PlayerEntry:
+    __slots__ = ("user_id", "cartelas", "mode", "sound", "notify")
+
+    def __init__(self, user_id: int, mode: str = "auto"):
+        self.user_id = user_id
+        self.cartelas: List[Cartela] = []
+        self.mode = mode
+        self.sound = True  # Voice clip of every draw (see broadcast.py)
+        self.notify = False  # Text message of every draw
+
+def play_bingo_audio(chat_id: int, number: int, language: Optional[str] = None):
+    # Queued on the outbox; after its first upload a clip is sent by file_id
+    clip = audio_catalogue.clip(number, language)
+    if clip is None:
+        outbox.send(chat_id, f"🎙️ Audio for {number} not found.")
+    else:
+        outbox.send(chat_id, clip)
 
 class BingoGame:
-    def __init__(self, game_id: int, entry_price: int = 10):
+    def __init__(self, game_id: int, entry_price: int = 10, seed: Optional[str] = None,
+                 catalogue: Optional[CartelaCatalogue] = None):
         self.game_id = game_id
         self.entry_price = entry_price
+        self.catalogue = catalogue or CATALOGUE
+        self.cartela_pool = CartelaPool(len(self.catalogue))
         self.pool = 0
-        self.players: Dict[int, List[dict]] = {}
+        self.players: Dict[int, PlayerEntry] = {}
+        # Every cartela sold in this game by slot; a removed player's slots become None
+        self.cartelas: List[Optional[Cartela]] = []
+        self.cartela_count = 0
+        # number -> packed (slot << CELL_BITS | cell) for every board holding it
+        self.number_index: Dict[int, array] = {}
         self.called_numbers: List[int] = []
+        self.manual_numbers: List[int] = []
+        self.new_deck(seed)
+        # Public calls, wins and status changes, streamed to viewers by sequence number
+        self.events = GameEventLog()
+        # Called as listener(game, old_status, new_status) whenever the status changes
+        self.status_listeners: List[Callable[["BingoGame", Optional[str], str], None]] = []
         self.status = "waiting"
         self.winner_id = None
+        self.winner_ids: List[int] = []
+        self.wins: List[Tuple[int, int, str]] = []  # (user_id, cartela_number, message)
+        self.payouts: Dict[int, int] = {}
         self.created_at = datetime.utcnow()
         self.finished_at = None
 
@@ -30,178 +124,333 @@ class BingoGame:
         self.max_players = 100
         self.call_interval = 3.5
         self.last_call_time = None
-        self.auto_call_timer = None
+        # Held by the scheduler thread and by request handlers while they mutate the game
+        self.lock = threading.RLock()
 
-        self.player_modes: Dict[int, str] = {}
-        self.sound_enabled: Dict[int, bool] = {}
-        self.leaderboard: Dict[int, Dict[str, int]] = {}
+        self.leaderboard = TopN(10, by_earnings=True)
         self.admin_earnings = 0
 
-    def generate_board(self, cartela_number: int) -> List[int]:
-        random.seed(cartela_number)
-        b = random.sample(range(1, 16), 5)
-        i = random.sample(range(16, 31), 5)
-        n = random.sample(range(31, 46), 5)
-        g = random.sample(range(46, 61), 5)
-        o = random.sample(range(61, 76), 5)
-        random.seed()
-
-        board = []
-        for row in range(5):
-            board.extend([b[row], i[row], n[row], g[row], o[row]])
-        return board
-
-    def add_player(self, user_id: int, cartela_number: Optional[int] = None, mode: str = "auto") -> List[int]:
-        if user_id not in self.players:
-            self.players[user_id] = []
-
-        if len(self.players[user_id]) >= 5:
-            return []
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: str):
+        previous = getattr(self, "_status", None)
+        self._status = value
+        if previous != value:
+            self.events.publish("status", {"status": value})
+            for listener in self.status_listeners:
+                listener(self, previous, value)
+
+    # 🎲 Private RNG and pre-shuffled deck; only seed_hash is published until the game ends
+    def new_deck(self, seed: Optional[str] = None):
+        self.seed = seed or secrets.token_hex(16)
+        self.seed_hash = self.hash_seed(self.seed)
+        self.rng = random.Random(self.seed)
+        self.deck = list(range(1, 76))
+        self.rng.shuffle(self.deck)
+        self.deck_cursor = 0
+        self.called_mask = 0
 
-        used_cartelas = {b['cartela_number'] for boards in self.players.values() for b in boards}
-        available = [n for n in range(1, 101) if n not in used_cartelas]
-        cartela_number = cartela_number or (random.choice(available) if available else 0)
+    @staticmethod
+    def hash_seed(seed: str) -> str:
+        return hashlib.sha256(seed.encode()).hexdigest()
 
-        board = self.generate_board(cartela_number)
-        self.players[user_id].append({
-            'board': board,
-            'marked': [board[12]],
-            'cartela_number': cartela_number
-        })
+    @staticmethod
+    def deck_for_seed(seed: str) -> List[int]:
+        deck = list(range(1, 76))
+        random.Random(seed).shuffle(deck)
+        return deck
 
+    @staticmethod
+    def verify_draws(seed: str, seed_hash: str, called_numbers: List[int], manual_numbers: Optional[List[int]] = None) -> bool:
+        # Automatic draws must be the seeded deck in order, minus any numbers called by hand
+        if BingoGame.hash_seed(seed) != seed_hash:
+            return False
+        manual = set(manual_numbers or ())
+        drawn = [n for n in called_numbers if n not in manual]
+        expected = [n for n in BingoGame.deck_for_seed(seed) if n not in manual]
+        return drawn == expected[:len(drawn)]
+
+    def is_called(self, number: int) -> bool:
+        return bool(self.called_mask >> number & 1)
+
+    def generate_board(self, cartela_number: int) -> Tuple[int, ...]:
+        return self.catalogue.board(cartela_number)
+
+    def player_cartelas(self, user_id: int) -> List[Cartela]:
+        entry = self.players.get(user_id)
+        return entry.cartelas if entry else []
+
+    def add_player(self, user_id: int, cartela_number: Optional[int] = None, mode: str = "auto") -> Tuple[int, ...]:
+        if len(self.player_cartelas(user_id)) >= MAX_CARTELAS:
+            return ()
+
+        if cartela_number:
+            if not self.cartela_pool.reserve(cartela_number):
+                return ()
+        else:
+            cartela_number = self.cartela_pool.pick(self.rng)
+            if cartela_number is None:
+                return ()
+
+        cartela = self._seat(user_id, cartela_number, mode)
         self.pool += self.entry_price
-        self.player_modes[user_id] = mode
-        self.sound_enabled[user_id] = True
+        self.events.publish("players", {"players": self.total_players(), "pool": self.pool})
 
         if self.status == "waiting" and self.total_players() >= self.min_players:
             self.start_game()
 
-        return board
+        return cartela.numbers()
+
+    def _seat(self, user_id: int, cartela_number: int, mode: str) -> Cartela:
+        # Hands an already reserved cartela to the player and indexes its numbers
+        entry = self.players.get(user_id)
+        if entry is None:
+            entry = self.players[user_id] = PlayerEntry(user_id, mode)
+        entry.mode = mode
+
+        cartela = Cartela(user_id, cartela_number, self.catalogue.board_bytes(cartela_number))
+        slot = len(self.cartelas)
+        self.cartelas.append(cartela)
+        entry.cartelas.append(cartela)
+        self.cartela_count += 1
+        for cell, number in enumerate(cartela.board):
+            if cell != FREE_CELL:
+                self.number_index.setdefault(number, array("i")).append(slot << CELL_BITS | cell)
+        return cartela
+
+    def remove_player(self, user_id: int) -> bool:
+        entry = self.players.pop(user_id, None)
+        if entry is None:
+            return False
+
+        slots = set()
+        for slot, cartela in enumerate(self.cartelas):
+            if cartela is not None and cartela.owner == user_id:
+                slots.add(slot)
+                self.cartelas[slot] = None
+
+        for cartela in entry.cartelas:
+            self.cartela_pool.release(cartela.number)
+            for number in cartela.board:
+                packed = self.number_index.get(number)
+                if packed:
+                    self.number_index[number] = array("i", (e for e in packed if e >> CELL_BITS not in slots))
+
+        self.cartela_count -= len(entry.cartelas)
+        self.pool -= self.entry_price * len(entry.cartelas)
+        self.events.publish("players", {"players": self.total_players(), "pool": self.pool})
+        return True
+
+    @classmethod
+    def restore(cls, game_id: int, entry_price: int, seed: str, status: str, pool: int,
+                called_numbers: List[int], manual_numbers: List[int],
+                cartelas: List[Tuple[int, int, List[int]]], created_at: Optional[datetime] = None,
+                catalogue: Optional[CartelaCatalogue] = None) -> "BingoGame":
+        # Rebuilds a persisted game from (user_id, cartela_number, marked_numbers) rows without
+        # replaying joins or draws, so nothing auto-starts and no calls are re-published
+        game = cls(game_id, entry_price, seed=seed, catalogue=catalogue)
+        if created_at:
+            game.created_at = created_at
+        for user_id, cartela_number, marked in cartelas:
+            if not game.cartela_pool.reserve(cartela_number):
+                continue
+            cartela = game._seat(user_id, cartela_number, "auto")
+            marked = set(marked)
+            for cell, number in enumerate(cartela.board):
+                if cell != FREE_CELL and number in marked:
+                    cartela.mask |= 1 << cell
+        for number in called_numbers:
+            game.called_numbers.append(number)
+            game.called_mask |= 1 << number
+        # The deck cursor stays at 0: call_number skips what was already drawn
+        game.manual_numbers = list(manual_numbers)
+        game.pool = pool
+        game.status = status
+        return game
 
     def total_players(self) -> int:
-        return sum(len(boards) for boards in self.players.values())
+        return self.cartela_count
 
     def toggle_sound(self, user_id: int, enabled: bool):
-        self.sound_enabled[user_id] = enabled
+        if user_id in self.players:
+            self.players[user_id].sound = enabled
+
+    def toggle_notify(self, user_id: int, enabled: bool):
+        if user_id in self.players:
+            self.players[user_id].notify = enabled
 
     def toggle_mode(self, user_id: int, mode: str):
-        self.player_modes[user_id] = mode
+        if user_id in self.players:
+            self.players[user_id].mode = mode
 
     def start_game(self, chat_id: Optional[int] = None, context: Optional[Any] = None) -> bool:
         if self.status != "waiting":
             return False
         self.status = "active"
-        self.call_number(chat_id=chat_id, context=context)
+        logging.info(f"🎲 Game {self.game_id} started, draw seed sha256 {self.seed_hash}")
+        self.draw(chat_id=chat_id, context=context)
         self.schedule_next_call(chat_id, context)
         return True
 
     def schedule_next_call(self, chat_id: Optional[int], context: Optional[Any]):
-        if self.status == "active" and "auto" in self.player_modes.values():
-            self.auto_call_timer = threading.Timer(
-                self.call_interval,
-                lambda: self.auto_call(chat_id, context)
-            )
-            self.auto_call_timer.start()
+        if self.status == "active" and any(entry.mode == "auto" for entry in self.players.values()):
+            call_scheduler.schedule(self, self.call_interval, lambda: self.auto_call(chat_id, context))
 
     def auto_call(self, chat_id: Optional[int], context: Optional[Any]):
-        if self.status != "active":
-            return
+        with self.lock:
+            if self.status != "active":
+                return
 
-        result = self.call_number(chat_id=chat_id, context=context)
-        if not result:
-            return
-
-        number = int(result["formatted"].split("-")[1])
-        for user_id in self.players:
-            self.mark_number(user_id, number)
-            won, message = self.check_winner(user_id)
-            if won:
-                self.end_game(user_id)
+            result = self.draw(chat_id=chat_id, context=context)
+            if not result:
+                return
+
+            if result["winners"]:
                 if context:
-                    context.bot.send_message(chat_id=user_id, text=f"🎉 {message}")
+                    for user_id in self.winner_ids:
+                        outbox.send(user_id, f"🎉 {self.win_message(user_id)}")
                 return
 
-        self.schedule_next_call(chat_id, context)
+            self.schedule_next_call(chat_id, context)
 
-    def call_number(self, chat_id: Optional[int] = None, context: Optional[Any] = None) -> Optional[Dict[str, Optional[str]]]:
-        available = [n for n in range(1, 76) if n not in self.called_numbers]
-        if not available:
+    def draw(self, chat_id: Optional[int] = None, context: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+        # Calls the next number, marks it on every board and settles the game if it completed any
+        result = self.call_number(chat_id=chat_id, context=context)
+        if result:
+            wins = self.evaluate_call(result["number"])
+            if wins:
+                self.settle(wins)
+            result["winners"] = list(self.winner_ids) if wins else []
+        return result
+
+    def call_number(self, chat_id: Optional[int] = None, context: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+        # Skip numbers that manual_call already took out of the deck
+        while self.deck_cursor < len(self.deck) and self.is_called(self.deck[self.deck_cursor]):
+            self.deck_cursor += 1
+        if self.deck_cursor >= len(self.deck):
             self.status = "finished"
             self.finished_at = datetime.utcnow()
             return None
 
-        number = random.choice(available)
-        self.called_numbers.append(number)
-        self.last_call_time = datetime.utcnow()
+        number = self.deck[self.deck_cursor]
+        self.deck_cursor += 1
+        self.record_call(number)
 
-        if chat_id and context and self.sound_enabled.get(chat_id, True):
-            play_bingo_audio(chat_id, number, context)
+        # Players hear the draw from the broadcaster; this is for a starting chat that is not playing
+        if chat_id and context and chat_id not in self.players:
+            play_bingo_audio(chat_id, number)
 
         return {
+            "number": number,
             "formatted": self.format_number(number),
             "audio": self.audio_filename(number)
         }
 
     def manual_call(self, number: int) -> bool:
-        if number in self.called_numbers or not (1 <= number <= 75):
+        if not (1 <= number <= 75) or self.is_called(number):
             return False
+        self.record_call(number)
+        self.manual_numbers.append(number)
+        return True
+
+    def record_call(self, number: int):
         self.called_numbers.append(number)
+        self.called_mask |= 1 << number
         self.last_call_time = datetime.utcnow()
-        return True
+        self.events.publish("call", {"number": number, "formatted": self.format_number(number)})
+
+    # Marks a called number on every board holding it and returns every board it completed,
+    # as (user_id, cartela_number, message) ordered by cartela number
+    def evaluate_call(self, number: int) -> List[Tuple[int, int, str]]:
+        wins = []
+        cartelas = self.cartelas
+        for packed in self.number_index.get(number, ()):
+            cartela = cartelas[packed >> CELL_BITS]
+            cell = packed & CELL_FIELD
+            mask = cartela.mask | 1 << cell
+            cartela.mask = mask
+            for message, pattern in CELL_PATTERNS[cell]:
+                if mask & pattern == pattern:
+                    wins.append((cartela.owner, cartela.number, message))
+                    break
+        wins.sort(key=lambda win: win[1])
+        return wins
 
     def mark_number(self, user_id: int, number: int) -> bool:
-        if user_id not in self.players:
+        if user_id not in self.players or not isinstance(number, int) or not 1 <= number <= 75:
+            return False
+        if not self.is_called(number):
             return False
         updated = False
-        for board in self.players[user_id]:
-            if number in board['board'] and number in self.called_numbers:
-                if number not in board['marked']:
-                    board['marked'].append(number)
-                    board['marked'].sort()
-                    updated = True
+        for cartela in self.players[user_id].cartelas:
+            cell = cartela.cell_of(number)
+            if cell >= 0 and not cartela.mask >> cell & 1:
+                cartela.mask |= 1 << cell
+                updated = True
+                # Only hand marks are logged; auto-marks follow from the call events
+                self.events.publish("mark", {"user_id": user_id, "cartela": cartela.number, "number": number})
         return updated
 
     def check_winner(self, user_id: int) -> Tuple[bool, str]:
         if user_id not in self.players:
             return False, "Player not in game"
 
-        for board in self.players[user_id]:
-            marked = set(board['marked'])
-            b = board['board']
+        for cartela in self.players[user_id].cartelas:
+            message = winning_pattern(cartela.mask)
+            if message:
+                return True, message
 
-            for i in range(0, 25, 5):
-                if all(b[i + j] in marked for j in range(5)):
-                    return True, "Winner - Row complete!"
-
-            for i in range(5):
-                if all(b[i + j*5] in marked for j in range(5)):
-                    return True, "Winner - Column complete!"
-
-            if all(b[i] in marked for i in [0, 6, 12, 18, 24]):
-                return True, "Winner - Diagonal complete!"
-            if all(b[i] in marked for i in [4, 8, 12, 16, 20]):
-                return True, "Winner - Diagonal complete!"
+        return False, "Keep playing"
 
-            if all(b[i] in marked for i in [0, 4, 20, 24]):
-                return True, "Winner - Corner complete!"
+    def end_game(self, winner_id: int) -> bool:
+        # A claim on a game that is not running (already settled, say) changes nothing
+        if self.status != "active":
+            return False
+        wins = []
+        for cartela in self.player_cartelas(winner_id):
+            message = winning_pattern(cartela.mask)
+            if message:
+                wins.append((winner_id, cartela.number, message))
+        return self.settle(wins or [(winner_id, 0, "Winner")])
+
+    # 🏆 Tie rule: every player with a winning cartela on the deciding ball gets an equal
+    # share of the payout (one share per player, however many of their cartelas won).
+    # Winners are ordered by lowest winning cartela number; indivisible birr go to the house.
+    # Settles at most once: only an active game can be settled, so a late claim cannot re-split the pool.
+    def settle(self, wins: List[Tuple[int, int, str]]) -> bool:
+        if self.status != "active" or not wins:
+            return False
+        self.wins = list(wins)
+        self.winner_ids = list(dict.fromkeys(user_id for user_id, _, _ in self.wins))
+        self.winner_id = self.winner_ids[0]
 
-        return False, "Keep playing"
+        commission = int(self.pool * 0.20)
+        share, remainder = divmod(self.pool - commission, len(self.winner_ids))
+        self.admin_earnings = commission + remainder
+        self.payouts = {user_id: share for user_id in self.winner_ids}
 
-    def end_game(self, winner_id: int):
-        self.winner_id = winner_id
-        self.status = "finished"
+        # Status listeners read the payouts, so flip the status only once they are settled
         self.finished_at = datetime.utcnow()
-        if self.auto_call_timer:
-            self.auto_call_timer.cancel()
+        self.status = "finished"
+        call_scheduler.cancel(self)
+        self.events.publish("win", {
+            "winners": self.winner_ids,
+            "cartelas": [number for _, number, _ in self.wins],
+            "payout": share
+        })
 
-        commission = int(self.pool * 0.20)
-        payout = self.pool - commission
-        self.admin_earnings = commission
+        for user_id in self.winner_ids:
+            self.leaderboard.add(user_id, 1, share)
+        return True
 
-        if winner_id not in self.leaderboard:
-            self.leaderboard[winner_id] = {"wins": 0, "earnings": 0}
-        self.leaderboard[winner_id]["wins"] += 1
-        self.leaderboard[winner_id]["earnings"] += payout
+    def win_message(self, user_id: int) -> str:
+        for winner, _, message in self.wins:
+            if winner == user_id:
+                return message
+        return "Winner"
 
     @staticmethod
     def format_number(number: int) -> str:
@@ -216,30 +465,43 @@ class BingoGame:
         return f"{BingoGame.format_number(number).lower().replace('-', '')}.ogg"
 
     def get_leaderboard(self, top_n: int = 10) -> List[Tuple[int, int, int]]:
-        sorted_lb = sorted(
-            self.leaderboard.items(),
-            key=lambda item: (item[1]["earnings"], item[1]["wins"]),
-            reverse=True
-        )
-        return [(uid, data["wins"], data["earnings"]) for uid, data in sorted_lb[:top_n]]
+        return self.leaderboard.top(top_n)
    
     def get_player_summary(self, user_id: int) -> List[Dict[str, Any]]:
+        entry = self.players.get(user_id)
+        if entry is None:
+            return []
         return [
             {
-                "cartela_number": b["cartela_number"],
-                "marked": b["marked"],
-                "mode": self.player_modes.get(user_id, "auto"),
-                "sound": self.sound_enabled.get(user_id, True)
+                "cartela_number": cartela.number,
+                "marked": cartela.marked(),
+                "mode": entry.mode,
+                "sound": entry.sound,
+                "notify": entry.notify
             }
-            for b in self.players.get(user_id, [])
+            for cartela in entry.cartelas
         ]
 
+    def public_state(self) -> Dict[str, Any]:
+        return {
+            "seq": self.events.seq,
+            "status": self.status,
+            "called": list(self.called_numbers),
+            "winners": list(self.winner_ids),
+            "pool": self.pool,
+            "players": self.total_players()
+        }
+
     def get_called_history(self) -> List[str]:
         return [self.format_number(n) for n in self.called_numbers]
 
-    def get_winner_board(self) -> Optional[List[int]]:
+    def get_winner_board(self) -> Optional[Tuple[int, ...]]:
         if self.winner_id and self.winner_id in self.players:
-            return self.players[self.winner_id][0]["board"]
+            cartelas = self.players[self.winner_id].cartelas
+            for cartela in cartelas:
+                if any(cartela.number == number for _, number, _ in self.wins):
+                    return cartela.numbers()
+            return cartelas[0].numbers()
         return None
 
     def is_ready(self) -> bool:
@@ -248,24 +510,38 @@ class BingoGame:
     def reset_game(self):
         self.status = "waiting"
         self.called_numbers.clear()
+        self.manual_numbers.clear()
+        self.new_deck()
         self.winner_id = None
+        self.winner_ids = []
+        self.wins = []
+        self.payouts = {}
         self.finished_at = None
         self.last_call_time = None
         self.admin_earnings = 0
-        if self.auto_call_timer:
-            self.auto_call_timer.cancel()
-            self.auto_call_timer = None
+        for cartela in self.cartelas:
+            if cartela is not None:
+                cartela.mask = 1 << FREE_CELL
+        call_scheduler.cancel(self)
         logging.info(f"🔄 Game {self.game_id} has been reset.")
 
     def summary(self) -> Dict[str, Any]:
-        return {
+        data = {
             "game_id": self.game_id,
             "status": self.status,
             "players": self.total_players(),
             "pool": self.pool,
             "called": len(self.called_numbers),
             "winner": self.winner_id,
+            "winners": list(self.winner_ids),
+            "payouts": dict(self.payouts),
             "created_at": self.created_at.isoformat(),
             "finished_at": self.finished_at.isoformat() if self.finished_at else None,
-            "admin_earnings": self.admin_earnings
+            "admin_earnings": self.admin_earnings,
+            "seed_hash": self.seed_hash
         }
+        if self.status == "finished":
+            # Reveal the seed so players can check the draw order with verify_draws
+            data["seed"] = self.seed
+            data["manual_calls"] = list(self.manual_numbers)
+        return data
@@ -0,0 +1,152 @@
+# leaderboard.py
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import LEADERBOARD_SIZE, LEADERBOARD_TTL
+
+WINDOWS = ("daily", "weekly", "all")
+
+
+class TopN:
+    # Running per-user totals with the best `size` users kept in rank order. Totals only grow,
+    # so an update can only move that one user up and re-ranking touches at most `size` entries.
+
+    def __init__(self, size: int = 10, by_earnings: bool = False):
+        self.size = size
+        self.by_earnings = by_earnings
+        self.totals: Dict[int, List[float]] = {}  # user_id -> [wins, earnings]
+        self._ranked: List[int] = []
+
+    def _key(self, user_id: int) -> Tuple[float, float]:
+        wins, earnings = self.totals[user_id]
+        return (earnings, wins) if self.by_earnings else (wins, earnings)
+
+    def add(self, user_id: int, wins: int = 1, earnings: float = 0):
+        totals = self.totals.setdefault(user_id, [0, 0])
+        totals[0] += wins
+        totals[1] += earnings
+
+        ranked = self._ranked
+        if user_id in ranked:
+            ranked.remove(user_id)
+        elif len(ranked) >= self.size and self._key(user_id) <= self._key(ranked[-1]):
+            return
+
+        key = self._key(user_id)
+        position = 0
+        while position < len(ranked) and self._key(ranked[position]) >= key:
+            position += 1
+        ranked.insert(position, user_id)
+        del ranked[self.size:]
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[int, float, float]]:
+        if n is not None and n > self.size:
+            ordered = sorted(self.totals, key=self._key, reverse=True)[:n]
+        else:
+            ordered = self._ranked[:n]
+        return [(user_id, *self.totals[user_id]) for user_id in ordered]
+
+
+def window_start(window: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    now = now or datetime.utcnow()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == "daily":
+        return midnight
+    if window == "weekly":
+        return midnight - timedelta(days=midnight.weekday())
+    return None
+
+
+class LeaderboardService:
+    # Top players per window, served from memory and updated as games settle. Each window
+    # is reloaded from jackpot_win transactions (written by ledger.settle_game) when its TTL
+    # runs out or the day/week rolls over. Players are User ids, as in the ledger.
+
+    def __init__(self, size: int = LEADERBOARD_SIZE, ttl: float = LEADERBOARD_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._boards: Dict[str, Tuple[Optional[datetime], float, TopN]] = {}
+        self._usernames: Dict[int, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def record_win(self, user_id: int, payout: float, when: Optional[datetime] = None):
+        when = when or datetime.utcnow()
+        with self._lock:
+            for window, (start, _, board) in list(self._boards.items()):
+                if start is not None and when < start:
+                    continue
+                if user_id in board.totals:
+                    board.add(user_id, 1, payout)
+                else:
+                    # Only the loaded top N have totals; anyone else's would start from zero, so the
+                    # window is read again (the win is already committed) on its next top()
+                    del self._boards[window]
+
+    def top(self, window: str = "all") -> List[Dict[str, Any]]:
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown leaderboard window: {window}")
+
+        start = window_start(window)
+        with self._lock:
+            cached = self._boards.get(window)
+        if not cached or cached[0] != start or cached[1] < time.monotonic():
+            board = self._load(start)
+            with self._lock:
+                self._boards[window] = (start, time.monotonic() + self.ttl, board)
+        else:
+            board = cached[2]
+
+        with self._lock:
+            rows = board.top()
+        self._resolve_usernames([user_id for user_id, _, _ in rows])
+        return [
+            {"user_id": user_id, "username": self._usernames.get(user_id), "wins": int(wins), "earnings": float(earnings)}
+            for user_id, wins, earnings in rows
+        ]
+
+    def invalidate(self, window: Optional[str] = None):
+        with self._lock:
+            if window:
+                self._boards.pop(window, None)
+            else:
+                self._boards.clear()
+
+    def _load(self, start: Optional[datetime]) -> TopN:
+        from sqlalchemy import func
+        from models import db, Transaction, User
+
+        wins = func.count(Transaction.id)
+        earnings = func.coalesce(func.sum(Transaction.amount), 0)
+        query = (
+            db.session.query(Transaction.user_id, User.username, wins, earnings)
+            .join(User, User.id == Transaction.user_id)
+            .filter(Transaction.type == "jackpot_win")
+        )
+        if start is not None:
+            query = query.filter(Transaction.created_at >= start)
+        rows = (
+            query.group_by(Transaction.user_id, User.username)
+            .order_by(wins.desc(), earnings.desc())
+            .limit(self.size)
+            .all()
+        )
+
+        board = TopN(self.size)
+        for user_id, username, user_wins, user_earnings in rows:
+            self._usernames[user_id] = username
+            board.add(user_id, user_wins, user_earnings)
+        return board
+
+    def _resolve_usernames(self, user_ids: List[int]):
+        missing = [user_id for user_id in user_ids if user_id not in self._usernames]
+        if missing:
+            from models import User
+            found = dict(User.query.with_entities(User.id, User.username).filter(User.id.in_(missing)).all())
+            for user_id in missing:
+                self._usernames[user_id] = found.get(user_id)
+
+
+# 🏆 Used by the Flask routes; app.py feeds it settled games
+leaderboards = LeaderboardService()
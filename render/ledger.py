@@ -0,0 +1,282 @@
+# ledger.py — every balance change goes through apply()
+#
+# Balances are moved with one conditional UPDATE, so concurrent requests never read-modify-write
+# a stale value, and each change writes a LedgerEntry in the same database transaction.
+#
+# Usage:
+#   python ledger.py backfill     # opening entries for users that predate the ledger
+#   python ledger.py reconcile    # list users whose balance differs from their ledger total
+import logging
+import sys
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, select, update
+
+from models import db, User, Transaction, LedgerEntry
+
+CENT = Decimal("0.01")
+
+# Sign applied to a transaction's amount when it is approved; "withdrawal" rows predate the ledger
+DEBIT_TYPES = ("withdraw", "withdrawal")
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+class TransactionNotPending(Exception):
+    pass
+
+
+class WrongTransactionType(Exception):
+    pass
+
+
+def _types(expected_type: str) -> Tuple[str, ...]:
+    # Either spelling of a withdrawal matches the other
+    return DEBIT_TYPES if expected_type in DEBIT_TYPES else (expected_type,)
+
+
+def _claim(tx_id: int, expected_type: Optional[str], **values) -> Transaction:
+    # pending -> values["status"] as one conditional UPDATE, so two admins cannot both settle one request.
+    # A given type is part of the condition: approving a deposit from the withdrawal screen changes nothing.
+    # Without one, the stored type decides how the amount is applied.
+    conditions = [Transaction.id == tx_id, Transaction.status == "pending"]
+    if expected_type:
+        conditions.append(Transaction.type.in_(_types(expected_type)))
+    claimed = db.session.execute(
+        update(Transaction)
+        .where(*conditions)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    tx = db.session.get(Transaction, tx_id, populate_existing=True)
+    if not claimed:
+        if tx is not None and tx.status == "pending":
+            raise WrongTransactionType(f"Transaction {tx_id} is a {tx.type}, not a {expected_type}")
+        raise TransactionNotPending(f"Transaction {tx_id} not found or already processed")
+    return tx
+
+
+def to_amount(value: Any) -> Decimal:
+    # Exact two-decimal amount; floats go through str() so 0.1 stays 0.10
+    try:
+        amount = Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError, TypeError):
+        raise ValueError(f"Invalid amount: {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {value!r}")
+    return amount
+
+
+def apply(user_id: int, amount: Any, kind: str, transaction_id: Optional[int] = None) -> Decimal:
+    # Adds amount (negative to debit) to the balance and records it; the caller commits.
+    # Raises InsufficientFunds, leaving the balance untouched, if it would go below zero.
+    amount = to_amount(amount)
+    stmt = (
+        update(User)
+        .where(User.id == user_id, User.balance + amount >= 0)
+        .values(balance=User.balance + amount)
+        .execution_options(synchronize_session=False)
+    )
+    if db.engine.dialect.update_returning:
+        balance = db.session.execute(stmt.returning(User.balance)).scalar()
+    else:
+        balance = None
+        if db.session.execute(stmt).rowcount:
+            balance = db.session.execute(select(User.balance).where(User.id == user_id)).scalar()
+    if balance is None:
+        raise InsufficientFunds(f"User {user_id} cannot cover {amount}")
+
+    db.session.add(LedgerEntry(
+        user_id=user_id,
+        transaction_id=transaction_id,
+        kind=kind,
+        amount=amount,
+        balance_after=balance
+    ))
+    user = db.session.identity_map.get((User, (user_id,), None))
+    if user is not None:
+        db.session.expire(user, ["balance"])
+    return to_amount(balance)
+
+
+def record(user_id: int, amount: Any, type: str, **fields) -> Tuple[Transaction, Decimal]:
+    # Completed transaction plus its balance change, committed together
+    amount = to_amount(amount)
+    now = datetime.utcnow()
+    tx = Transaction(user_id=user_id, type=type, amount=abs(amount), status="completed",
+                     created_at=now, completed_at=now, **fields)
+    db.session.add(tx)
+    try:
+        db.session.flush()
+        balance = apply(user_id, amount, type, tx.id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return tx, balance
+
+
+def approve(tx_id: int, expected_type: Optional[str] = None, approved_by: Optional[str] = None) -> Tuple[Transaction, Decimal]:
+    now = datetime.utcnow()
+    try:
+        tx = _claim(tx_id, expected_type, status="approved", completed_at=now, updated_at=now,
+                    approved_by=approved_by)
+        amount = -tx.amount if tx.type in DEBIT_TYPES else tx.amount
+        balance = apply(tx.user_id, amount, tx.type, tx.id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return tx, balance
+
+
+def reject(tx_id: int, expected_type: Optional[str] = None, note: Optional[str] = None) -> Transaction:
+    now = datetime.utcnow()
+    try:
+        tx = _claim(tx_id, expected_type, status="rejected", completed_at=now, updated_at=now, admin_note=note)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return tx
+
+
+def settle_game(game_id: int, payouts: Dict[int, Any], players: Iterable[int]) -> Dict[int, Decimal]:
+    # Credits each winner's payout as a completed jackpot_win and counts the game in every player's
+    # games_played / games_won, in one database transaction. Live games know players by Telegram id;
+    # a winner without a User row has no wallet and is logged instead. Returns User.id -> amount paid.
+    reference = f"game:{game_id}"
+    telegram_ids = set(players) | set(payouts)
+    if not telegram_ids:
+        return {}
+    try:
+        if db.session.execute(
+            select(Transaction.id).where(Transaction.type == "jackpot_win", Transaction.reference == reference)
+        ).first():
+            logging.warning(f"⚠️ Game {game_id} was already paid out")
+            return {}
+        users = dict(db.session.execute(
+            select(User.telegram_id, User.id).where(User.telegram_id.in_(telegram_ids))
+        ).all())
+        db.session.execute(
+            update(User)
+            .where(User.id.in_([users[t] for t in set(players) if t in users]))
+            .values(games_played=func.coalesce(User.games_played, 0) + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+        paid: Dict[int, Decimal] = {}
+        now = datetime.utcnow()
+        for telegram_id, payout in payouts.items():
+            user_id = users.get(telegram_id)
+            if user_id is None:
+                logging.error(f"❌ Game {game_id} winner {telegram_id} has no account; {payout} birr not credited")
+                continue
+            amount = to_amount(payout)
+            tx = Transaction(user_id=user_id, type="jackpot_win", amount=amount, status="completed",
+                             reference=reference, created_at=now, completed_at=now)
+            db.session.add(tx)
+            db.session.flush()
+            apply(user_id, amount, "jackpot_win", tx.id)
+            db.session.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(games_won=func.coalesce(User.games_won, 0) + 1)
+                .execution_options(synchronize_session=False)
+            )
+            paid[user_id] = amount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return paid
+
+
+def refund_entries(game_id: int, user_id: Optional[int] = None, limit: Any = None) -> Dict[int, Decimal]:
+    # Pays back the entry fees still held for a game as completed game_refund transactions, netting
+    # earlier refunds so a second run pays nothing. user_id and limit narrow it to one player and at
+    # most one fee (a seat that fell through). Returns User.id -> amount refunded.
+    reference = f"game:{game_id}"
+    held = func.sum(case((Transaction.type == "game_refund", -Transaction.amount), else_=Transaction.amount))
+    query = (
+        select(Transaction.user_id, held)
+        .where(Transaction.reference == reference, Transaction.type.in_(("game_entry", "game_refund")))
+        .group_by(Transaction.user_id)
+    )
+    if user_id is not None:
+        query = query.where(Transaction.user_id == user_id)
+    try:
+        refunded: Dict[int, Decimal] = {}
+        now = datetime.utcnow()
+        for owner, amount in db.session.execute(query).all():
+            amount = to_amount(amount)
+            if limit is not None:
+                amount = min(amount, to_amount(limit))
+            if amount <= 0:
+                continue
+            tx = Transaction(user_id=owner, type="game_refund", amount=amount, status="completed",
+                             reference=reference, created_at=now, completed_at=now)
+            db.session.add(tx)
+            db.session.flush()
+            apply(owner, amount, "game_refund", tx.id)
+            refunded[owner] = amount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return refunded
+
+
+def backfill_opening_balances() -> int:
+    # One "opening" entry per user with a balance but no ledger history yet
+    has_entries = select(LedgerEntry.id).where(LedgerEntry.user_id == User.id).exists()
+    users = db.session.execute(
+        select(User.id, User.balance).where(~has_entries, User.balance != 0)
+    ).all()
+    for user_id, balance in users:
+        db.session.add(LedgerEntry(user_id=user_id, kind="opening", amount=balance, balance_after=balance))
+    db.session.commit()
+    return len(users)
+
+
+def reconcile() -> List[Tuple[int, Decimal, Decimal]]:
+    # (user_id, balance, ledger_total) for every user whose balance disagrees with the ledger
+    totals = (
+        select(LedgerEntry.user_id, func.sum(LedgerEntry.amount).label("total"))
+        .group_by(LedgerEntry.user_id)
+        .subquery()
+    )
+    ledger_total = func.coalesce(totals.c.total, 0)
+    rows = db.session.execute(
+        select(User.id, User.balance, ledger_total)
+        .outerjoin(totals, totals.c.user_id == User.id)
+        .where(User.balance != ledger_total)
+        .order_by(User.id)
+    ).all()
+    mismatches = [(user_id, to_amount(balance), to_amount(total)) for user_id, balance, total in rows]
+    # SQLite keeps NUMERIC as REAL, so filter out float noise after rounding
+    mismatches = [row for row in mismatches if row[1] != row[2]]
+    for user_id, balance, total in mismatches:
+        logging.warning(f"⚠️ Ledger mismatch for user {user_id}: balance {balance}, ledger {total}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    from app import app
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "reconcile"
+    with app.app_context():
+        if command == "backfill":
+            print(f"Backfilled {backfill_opening_balances()} opening balance(s)")
+        elif command == "reconcile":
+            mismatches = reconcile()
+            for user_id, balance, total in mismatches:
+                print(f"user {user_id}: balance {balance} != ledger {total}")
+            print(f"{len(mismatches)} mismatch(es)")
+            sys.exit(1 if mismatches else 0)
+        else:
+            sys.exit(f"Unknown command: {command}")
@@ -0,0 +1,262 @@
+# metrics.py — request and game metrics in Prometheus text format, plus an opt-in profiler
+#
+# init_metrics(app, registry) wraps every request and serves GET /metrics. Event streams stay open
+# for minutes, so their durations go to a histogram of their own instead of the request latencies. With
+# METRICS_PROFILE_RATE > 0 a sample of requests runs under cProfile, and the profiles of
+# the METRICS_PROFILE_KEEP slowest ones are kept in METRICS_PROFILE_DIR (open with pstats/snakeviz).
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Response, g, request
+
+from config import METRICS_PROFILE_RATE, METRICS_PROFILE_DIR, METRICS_PROFILE_KEEP
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STREAM_BUCKETS = (1.0, 10.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0)
+STREAM_MIMETYPES = ("text/event-stream",)
+LIVE_STATUSES = ("waiting", "active")
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: Any) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class Histogram:
+    # Cumulative-bucket histogram per label set, as Prometheus expects
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._series: Dict[Tuple, List[float]] = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self, name: str, label_names: Tuple[str, ...]) -> List[str]:
+        lines = []
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            base = dict(zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(**base, le=le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(**base)} {values[-1]:.6f}")
+            lines.append(f"{name}_count{_labels(**base)} {cumulative}")
+        return lines
+
+
+class SlowRequestProfiler:
+    # Profiles a random sample of requests, one at a time, and keeps the slowest profiles on disk
+
+    def __init__(self, rate: float = METRICS_PROFILE_RATE, directory: str = METRICS_PROFILE_DIR,
+                 keep: int = METRICS_PROFILE_KEEP):
+        self.rate = rate
+        self.directory = directory
+        self.keep = keep
+        self._busy = threading.Lock()  # cProfile cannot profile two threads' requests at once
+        self._kept: List[Tuple[float, str]] = []  # (seconds, path), slowest first
+        self._lock = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        if self.rate <= 0 or random.random() >= self.rate or not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            self._busy.release()
+            return None
+        return profile
+
+    def discard(self, profile: cProfile.Profile):
+        profile.disable()
+        self._busy.release()
+
+    def finish(self, profile: cProfile.Profile, elapsed: float, label: str):
+        profile.disable()
+        self._busy.release()
+        with self._lock:
+            if len(self._kept) >= self.keep and elapsed <= self._kept[-1][0]:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")[:80]
+            path = os.path.join(self.directory, f"{elapsed * 1000:09.1f}ms-{slug}-{int(time.time())}.prof")
+            profile.dump_stats(path)
+            self._kept.append((elapsed, path))
+            self._kept.sort(reverse=True)
+            for _, dropped in self._kept[self.keep:]:
+                try:
+                    os.remove(dropped)
+                except OSError:
+                    pass
+            del self._kept[self.keep:]
+        logging.info(f"🔬 Kept profile of {label} ({elapsed * 1000:.1f} ms): {path}")
+
+
+class Metrics:
+    def __init__(self, profiler: Optional[SlowRequestProfiler] = None):
+        self.latency = Histogram()
+        self.streams = Histogram(STREAM_BUCKETS)
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.in_flight = 0
+        self.draws_total = 0
+        self._lock = threading.Lock()
+        self.profiler = profiler or SlowRequestProfiler()
+        # Extra exporters called at scrape time, each returning Prometheus text lines
+        self.collectors: List[Callable[[], List[str]]] = []
+
+    # -------------------- REQUEST HOOKS --------------------
+
+    def before_request(self):
+        g._metrics_started = time.perf_counter()
+        g._metrics_profile = self.profiler.start()
+        with self._lock:
+            self.in_flight += 1
+
+    def after_request(self, response):
+        g._metrics_status = response.status_code
+        g._metrics_stream = response.mimetype in STREAM_MIMETYPES
+        return response
+
+    def teardown_request(self, exc=None):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        # The route template, not the raw path, so label cardinality stays bounded
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        status = g.pop("_metrics_status", 500)
+        stream = g.pop("_metrics_stream", False)
+        (self.streams if stream else self.latency).observe((endpoint, request.method), elapsed)
+        with self._lock:
+            self.in_flight -= 1
+            key = (endpoint, request.method, status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+        profile = g.pop("_metrics_profile", None)
+        if profile is not None:
+            if stream:
+                self.profiler.discard(profile)
+            else:
+                self.profiler.finish(profile, elapsed, f"{request.method} {endpoint}")
+
+    # -------------------- GAME HOOKS --------------------
+
+    def track(self, game):
+        game.events.subscribers.append(self._on_game_event)
+
+    def _on_game_event(self, event):
+        if event.type == "call":
+            with self._lock:
+                self.draws_total += 1
+
+    # -------------------- EXPOSITION --------------------
+
+    def render(self) -> str:
+        lines = [
+            "# HELP bingo_http_request_duration_seconds Request latency by route template, event streams excluded.",
+            "# TYPE bingo_http_request_duration_seconds histogram",
+        ]
+        lines += self.latency.render("bingo_http_request_duration_seconds", ("endpoint", "method"))
+        lines += [
+            "# HELP bingo_http_stream_duration_seconds How long event streams stayed open, by route template.",
+            "# TYPE bingo_http_stream_duration_seconds histogram",
+        ]
+        lines += self.streams.render("bingo_http_stream_duration_seconds", ("endpoint", "method"))
+
+        lines += [
+            "# HELP bingo_http_responses_total Responses by route template and status code.",
+            "# TYPE bingo_http_responses_total counter",
+        ]
+        with self._lock:
+            responses = sorted(self.responses.items())
+            in_flight = self.in_flight
+            draws_total = self.draws_total
+        for (endpoint, method, status), count in responses:
+            lines.append(f"bingo_http_responses_total{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+
+        lines += [
+            "# HELP bingo_http_requests_in_flight Requests currently being served, open streams included.",
+            "# TYPE bingo_http_requests_in_flight gauge",
+            f"bingo_http_requests_in_flight {in_flight}",
+            "# HELP bingo_draws_total Numbers drawn across all rooms; use rate() for draws per second.",
+            "# TYPE bingo_draws_total counter",
+            f"bingo_draws_total {draws_total}",
+        ]
+        for collector in self.collectors:
+            try:
+                lines += collector()
+            except Exception:
+                logging.exception("❌ Metrics collector failed")
+        return "\n".join(lines) + "\n"
+
+
+def registry_collector(registry) -> Callable[[], List[str]]:
+    def collect() -> List[str]:
+        counts = registry.counts()
+        lines = ["# HELP bingo_games Rooms in memory by status.", "# TYPE bingo_games gauge"]
+        lines += [f"bingo_games{_labels(status=status)} {count}" for status, count in counts.items()]
+
+        cartelas = {status: 0 for status in LIVE_STATUSES}
+        pools = {status: 0 for status in LIVE_STATUSES}
+        for status in LIVE_STATUSES:
+            for game in registry.by_status(status):
+                summary = game.summary()
+                cartelas[status] += summary["players"]
+                pools[status] += summary["pool"]
+        lines += ["# HELP bingo_cartelas_in_play Cartelas sold in live rooms.", "# TYPE bingo_cartelas_in_play gauge"]
+        lines += [f"bingo_cartelas_in_play{_labels(status=status)} {count}" for status, count in cartelas.items()]
+        lines += ["# HELP bingo_pool_birr Prize pools held by live rooms.", "# TYPE bingo_pool_birr gauge"]
+        lines += [f"bingo_pool_birr{_labels(status=status)} {total}" for status, total in pools.items()]
+        return lines
+    return collect
+
+
+def stats_collector(prefix: str, stats: Callable[[], Dict[str, Any]]) -> Callable[[], List[str]]:
+    # Flattens a stats() dict of numbers (one level of nesting) into gauges named prefix_key
+    def collect() -> List[str]:
+        lines = []
+        for key, value in stats().items():
+            values = value.items() if isinstance(value, dict) else [("", value)]
+            for sub, number in values:
+                if isinstance(number, (int, float)) and not isinstance(number, bool):
+                    name = f"{prefix}_{key}_{sub}" if sub else f"{prefix}_{key}"
+                    lines += [f"# TYPE {name} gauge", f"{name} {number}"]
+        return lines
+    return collect
+
+
+def init_metrics(app, registry=None) -> Metrics:
+    metrics = Metrics()
+    app.before_request(metrics.before_request)
+    app.after_request(metrics.after_request)
+    app.teardown_request(metrics.teardown_request)
+    if registry is not None:
+        registry.add_listeners.append(metrics.track)
+        metrics.collectors.append(registry_collector(registry))
+
+    @app.route("/metrics", methods=["GET"])
+    def prometheus_metrics():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    return metrics
@@ -0,0 +1,176 @@
+# migrations.py — in-place schema upgrades that db.create_all() cannot do on existing tables
+#
+# Usage:
+#   python migrations.py                  # add the bitmask columns and convert pickled rows,
+#                                         # add the Telegram id columns, and turn Float money
+#                                         # columns into NUMERIC(12,2)
+#   python migrations.py --drop-legacy    # ...then drop the old PickleType columns
+import logging
+import pickle
+import sys
+from typing import Dict, List
+
+from sqlalchemy import Column, inspect, text
+
+import bitmask
+from models import db, Game, GameParticipant, User, Transaction
+
+BATCH_SIZE = 500
+
+# model -> (legacy pickled column, columns added after the table was first created)
+BITMASK_COLUMNS = {
+    Game: ("called_numbers", ["called_lo", "called_hi", "call_sequence", "manual_lo", "manual_hi", "seed"]),
+    GameParticipant: ("marked_numbers", ["marked_lo", "marked_hi"]),
+}
+
+# model -> columns added after the table was first created, with nothing to convert
+NEW_COLUMNS = {
+    Game: ["winner_telegram_id"],
+    GameParticipant: ["telegram_id"],
+}
+
+# Money columns that were Float before the ledger; model -> columns now Numeric(12, 2)
+NUMERIC_COLUMNS = {
+    User: ["balance"],
+    Transaction: ["amount"],
+}
+
+
+def _add_column(table: str, column: Column):
+    dialect = db.engine.dialect
+    type_sql = column.type.compile(dialect=dialect)
+    if column.nullable:
+        constraint = ""
+    elif isinstance(column.type, db.LargeBinary):
+        constraint = " NOT NULL DEFAULT " + ("X''" if dialect.name == "sqlite" else "''")
+    else:
+        constraint = " NOT NULL DEFAULT 0"
+    db.session.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {column.name} {type_sql}{constraint}'))
+    logging.info(f"➕ Added {table}.{column.name}")
+
+
+def _legacy_values(raw) -> List[int]:
+    if raw is None:
+        return []
+    values = pickle.loads(raw) if isinstance(raw, (bytes, bytearray, memoryview)) else raw
+    return [int(number) for number in values or []]
+
+
+def _convert(model, legacy: str) -> int:
+    table = model.__table__.name
+    converted = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(text(
+            f'SELECT id, {legacy} FROM "{table}" WHERE id > :last_id AND {legacy} IS NOT NULL '
+            f'ORDER BY id LIMIT :limit'
+        ), {"last_id": last_id, "limit": BATCH_SIZE}).all()
+        if not rows:
+            return converted
+
+        updates: List[Dict] = []
+        for row_id, raw in rows:
+            numbers = _legacy_values(raw)
+            lo, hi = bitmask.split(bitmask.from_numbers(numbers))
+            if model is Game:
+                # Drop repeats but keep the first-call order
+                sequence = bitmask.pack_sequence(dict.fromkeys(numbers))
+                updates.append({"id": row_id, "lo": lo, "hi": hi, "sequence": sequence})
+            else:
+                updates.append({"id": row_id, "lo": lo, "hi": hi})
+
+        if model is Game:
+            statement = f'UPDATE "{table}" SET called_lo = :lo, called_hi = :hi, call_sequence = :sequence WHERE id = :id'
+        else:
+            statement = f'UPDATE "{table}" SET marked_lo = :lo, marked_hi = :hi WHERE id = :id'
+        db.session.execute(text(statement), updates)
+        db.session.commit()
+        converted += len(rows)
+        last_id = rows[-1][0]
+
+
+def migrate_bitmasks(drop_legacy: bool = False) -> Dict[str, int]:
+    # Idempotent: columns that exist are left alone, and rows are re-derived from the legacy column
+    inspector = inspect(db.engine)
+    converted = {}
+    for model, (legacy, columns) in BITMASK_COLUMNS.items():
+        table = model.__table__.name
+        if not inspector.has_table(table):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        for name in columns:
+            if name not in existing:
+                _add_column(table, model.__table__.c[name])
+        db.session.commit()
+
+        if legacy in existing:
+            converted[table] = _convert(model, legacy)
+            logging.info(f"🔁 Converted {converted[table]} {table} row(s) from {legacy}")
+            if drop_legacy:
+                db.session.execute(text(f'ALTER TABLE "{table}" DROP COLUMN {legacy}'))
+                db.session.commit()
+                logging.info(f"🗑️ Dropped {table}.{legacy}")
+    return converted
+
+
+def migrate_telegram_ids() -> List[str]:
+    # Adds the columns that hold players' Telegram ids, and lets game_participant.user_id be NULL
+    # for players without a User row (PostgreSQL only; SQLite cannot drop NOT NULL in place).
+    inspector = inspect(db.engine)
+    added = []
+    for model, columns in NEW_COLUMNS.items():
+        table = model.__table__.name
+        if not inspector.has_table(table):
+            continue
+        existing = {column["name"]: column for column in inspector.get_columns(table)}
+        for name in columns:
+            if name not in existing:
+                _add_column(table, model.__table__.c[name])
+                added.append(f"{table}.{name}")
+        if model is GameParticipant and db.engine.dialect.name == "postgresql" \
+                and not existing.get("user_id", {}).get("nullable", True):
+            db.session.execute(text(f'ALTER TABLE "{table}" ALTER COLUMN user_id DROP NOT NULL'))
+            logging.info(f"🔓 {table}.user_id may now be NULL")
+        db.session.commit()
+    return added
+
+
+def migrate_numeric() -> List[str]:
+    # PostgreSQL only: SQLite stores any NUMERIC column with REAL affinity, so there is nothing to alter.
+    # Idempotent: columns already NUMERIC(12,2) are skipped. Returns the columns converted.
+    if db.engine.dialect.name != "postgresql":
+        return []
+    inspector = inspect(db.engine)
+    converted = []
+    for model, columns in NUMERIC_COLUMNS.items():
+        table = model.__table__.name
+        if not inspector.has_table(table):
+            continue
+        existing = {column["name"]: column["type"] for column in inspector.get_columns(table)}
+        for name in columns:
+            current = existing.get(name)
+            if current is None or (isinstance(current, db.Numeric) and not isinstance(current, db.Float)
+                                   and (current.precision, current.scale) == (12, 2)):
+                continue
+            column = model.__table__.c[name]
+            if not column.nullable:
+                db.session.execute(text(f'UPDATE "{table}" SET {name} = 0 WHERE {name} IS NULL'))
+            db.session.execute(text(
+                f'ALTER TABLE "{table}" ALTER COLUMN {name} TYPE NUMERIC(12,2) USING round({name}::numeric, 2)'
+            ))
+            if not column.nullable:
+                db.session.execute(text(f'ALTER TABLE "{table}" ALTER COLUMN {name} SET NOT NULL'))
+            db.session.commit()
+            converted.append(f"{table}.{name}")
+            logging.info(f"🔁 Converted {table}.{name} from {current} to NUMERIC(12,2)")
+    return converted
+
+
+if __name__ == "__main__":
+    from app import app
+
+    logging.basicConfig(level=logging.INFO)
+    with app.app_context():
+        print(migrate_bitmasks(drop_legacy="--drop-legacy" in sys.argv))
+        print(migrate_telegram_ids())
+        print(migrate_numeric())
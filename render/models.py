@@ -1,7 +1,8 @@
 from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
-
-db = SQLAlchemy()
+from typing import Iterable, List
+from sqlalchemy.ext.hybrid import hybrid_method
+import bitmask
+from database import db
 
 # -------------------- USER MODEL --------------------
 
@@ -10,7 +11,7 @@ class User(db.Model):
     telegram_id = db.Column(db.BigInteger, unique=True, nullable=False, index=True)
     username = db.Column(db.String(64))
     phone = db.Column(db.String(20))
-    balance = db.Column(db.Float, default=0.0)
+    balance = db.Column(db.Numeric(12, 2), default=0, nullable=False)  # Only changed through ledger.apply
     games_played = db.Column(db.Integer, default=0)
     games_won = db.Column(db.Integer, default=0)
     sound_enabled = db.Column(db.Boolean, default=True)
@@ -39,9 +40,16 @@ class Game(db.Model):
     pool = db.Column(db.Float, default=0.0)
     payout = db.Column(db.Float, default=0.0)
     commission = db.Column(db.Float, default=0.0)
-    called_numbers = db.Column(db.PickleType)
+    # Called numbers as a 75-bit mask (see bitmask.py) plus one byte per call in call order
+    called_lo = db.Column(db.BigInteger, default=0, nullable=False)
+    called_hi = db.Column(db.BigInteger, default=0, nullable=False)
+    call_sequence = db.Column(db.LargeBinary(bitmask.MAX_NUMBER), default=b"", nullable=False)
+    manual_lo = db.Column(db.BigInteger, default=0, nullable=False)  # Numbers called by hand
+    manual_hi = db.Column(db.BigInteger, default=0, nullable=False)
+    seed = db.Column(db.String(64))  # Draw seed, kept server-side so a restored game resumes the same deck
 
     winner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    winner_telegram_id = db.Column(db.BigInteger)  # Set by the bot's rooms, whose winner may have no User row
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     finished_at = db.Column(db.DateTime)
@@ -50,16 +58,53 @@ class Game(db.Model):
     # Relationships
     participants = db.relationship('GameParticipant', backref='game', lazy=True)
 
+    @property
+    def called_numbers(self) -> List[int]:
+        return bitmask.unpack_sequence(self.call_sequence)
+
+    @called_numbers.setter
+    def called_numbers(self, numbers: Iterable[int]):
+        numbers = list(numbers)
+        self.call_sequence = bitmask.pack_sequence(numbers)
+        self.called_lo, self.called_hi = bitmask.split(bitmask.from_numbers(numbers))
+
+    @hybrid_method
+    def is_called(self, number: int) -> bool:
+        return bool(bitmask.join(self.called_lo, self.called_hi) & bitmask.number_bit(number))
+
+    @is_called.expression
+    def is_called(cls, number: int):
+        # A bitwise predicate no index can serve: every candidate row is scanned, so narrow by id/status first
+        column, bit = bitmask.column_bit(number)
+        return getattr(cls, f"called_{column}").op("&")(bit) != 0
+
+    @property
+    def manual_numbers(self) -> List[int]:
+        return bitmask.to_numbers(bitmask.join(self.manual_lo, self.manual_hi))
+
+    @manual_numbers.setter
+    def manual_numbers(self, numbers: Iterable[int]):
+        self.manual_lo, self.manual_hi = bitmask.split(bitmask.from_numbers(numbers))
+
+    def call(self, number: int) -> bool:
+        # Appends number to the sequence; False if it was already called
+        if self.is_called(number):
+            return False
+        self.called_numbers = self.called_numbers + [number]
+        return True
+
 # -------------------- GAME PARTICIPANT MODEL --------------------
 
 class GameParticipant(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)  # NULL for players without a User row
+    telegram_id = db.Column(db.BigInteger, index=True)  # The player as live games know them
 
     cartela_number = db.Column(db.Integer, nullable=False)
     cartela_count = db.Column(db.Integer, default=1)
-    marked_numbers = db.Column(db.PickleType)
+    marked_lo = db.Column(db.BigInteger, default=0, nullable=False)
+    marked_hi = db.Column(db.BigInteger, default=0, nullable=False)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -67,14 +112,36 @@ class GameParticipant(db.Model):
         db.UniqueConstraint('game_id', 'cartela_number', name='unique_cartela_per_game'),
     )
 
+    @property
+    def marked_numbers(self) -> List[int]:
+        return bitmask.to_numbers(bitmask.join(self.marked_lo, self.marked_hi))
+
+    @marked_numbers.setter
+    def marked_numbers(self, numbers: Iterable[int]):
+        self.marked_lo, self.marked_hi = bitmask.split(bitmask.from_numbers(numbers))
+
+    @hybrid_method
+    def has_marked(self, number: int) -> bool:
+        return bool(bitmask.join(self.marked_lo, self.marked_hi) & bitmask.number_bit(number))
+
+    @has_marked.expression
+    def has_marked(cls, number: int):
+        # e.g. GameParticipant.query.filter_by(game_id=1).filter(GameParticipant.has_marked(42))
+        # No index can serve the bitwise predicate; the game_id filter (unique_cartela_per_game) bounds the scan
+        column, bit = bitmask.column_bit(number)
+        return getattr(cls, f"marked_{column}").op("&")(bit) != 0
+
+    def mark(self, number: int):
+        self.marked_numbers = self.marked_numbers + [number]
+
 # -------------------- TRANSACTION MODEL --------------------
 
 class Transaction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
-    type = db.Column(db.String(20), index=True)  # deposit, withdraw, referral_bonus, jackpot_win
-    amount = db.Column(db.Float, nullable=False)
+    type = db.Column(db.String(20), index=True)  # deposit, withdraw, referral_bonus, jackpot_win, game_entry, game_refund
+    amount = db.Column(db.Numeric(12, 2), nullable=False)
     status = db.Column(db.String(20), default='pending', index=True)
 
     method = db.Column(db.String(20))            # cbe_birr, telebirr, etc.
@@ -96,6 +163,20 @@ class Transaction(db.Model):
     completed_at = db.Column(db.DateTime)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+# -------------------- LEDGER MODEL --------------------
+
+class LedgerEntry(db.Model):
+    # Append-only record of every balance change; balance == sum(amount) per user
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id'), nullable=True, index=True)
+
+    kind = db.Column(db.String(20), nullable=False)  # deposit, withdraw, jackpot_win, game_entry, game_refund, adjustment, opening
+    amount = db.Column(db.Numeric(12, 2), nullable=False)  # Signed
+    balance_after = db.Column(db.Numeric(12, 2), nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 # -------------------- SCHEDULED GAME MODEL --------------------
 
 class ScheduledGame(db.Model):
@@ -0,0 +1,353 @@
+# outbox.py — queued, rate-limited delivery of outbound Telegram messages
+#
+# Callers only enqueue: outbox.send(chat_id, message) returns at once from any thread. One asyncio
+# loop on a background thread drains the queue with OUTBOX_WORKERS concurrent senders, a global
+# token bucket (OUTBOX_RATE messages/s; Telegram allows a bot about 30) and at most one message
+# per chat every OUTBOX_CHAT_INTERVAL seconds. Notices that pile up for a chat while it waits its
+# turn are joined into one message; other payloads (voice clips, see audio_catalogue.py) provide
+# their own async deliver(bot, chat_id) and go out one at a time. A 429 pauses sending for its retry_after, network errors back
+# off exponentially up to OUTBOX_MAX_RETRIES, and chats that blocked the bot are dropped.
+#
+# Without TELEGRAM_BOT_TOKEN messages go to a FakeBot, which also stands in for the Bot API in
+# local load tests (FakeBot(rate=30) answers 429 like Telegram does past its flood limit).
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from config import (
+    TELEGRAM_BOT_TOKEN, OUTBOX_RATE, OUTBOX_CHAT_INTERVAL, OUTBOX_WORKERS, OUTBOX_MAX_RETRIES
+)
+
+MAX_MESSAGE_LENGTH = 4096  # Telegram's limit per text message
+BATCH_SEPARATOR = "\n\n"
+MAX_BACKOFF = 60.0
+
+
+class TokenBucket:
+    # Global send budget; pause() holds everyone back after a flood-control answer
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        # A burst of b allows b + rate sends in any one second, so keep it small under a hard limit
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class FakeBot:
+    # Local stand-in for telegram.Bot: records what would have been sent, with optional latency,
+    # Telegram-like flood limits (global rate and one message per chat per second) and blocked chats.
+    # Voice uploads get a made-up file_id that later send_voice calls accept.
+
+    def __init__(self, latency: float = 0.0, rate: Optional[float] = None, chat_interval: float = 0.0,
+                 blocked: Optional[Set[int]] = None, log: bool = False):
+        self.latency = latency
+        self.rate = rate
+        self.chat_interval = chat_interval
+        self.blocked = blocked or set()
+        self.log = log
+        self.sent: List[Tuple[float, int, Any]] = []
+        self.uploads = 0
+        self.rejected = 0
+        self._recent: Deque[float] = deque()
+        self._last_by_chat: Dict[int, float] = {}
+
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any):
+        await self._admit(chat_id)
+        self.sent.append((time.monotonic(), chat_id, text))
+        if self.log:
+            logging.info(f"📨 [fake] to {chat_id}: {text}")
+
+    async def send_voice(self, chat_id: int, voice: Any, **kwargs: Any):
+        await self._admit(chat_id)
+        if isinstance(voice, str):
+            if not voice.startswith("fake-voice-"):
+                raise BadRequest("Wrong file identifier/http url specified")
+            file_id = voice
+        else:
+            self.uploads += 1
+            file_id = f"fake-voice-{self.uploads}"
+        self.sent.append((time.monotonic(), chat_id, file_id))
+        if self.log:
+            logging.info(f"🎙️ [fake] voice to {chat_id}: {file_id}")
+        return SimpleNamespace(voice=SimpleNamespace(file_id=file_id))
+
+    async def _admit(self, chat_id: int):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if chat_id in self.blocked:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] >= 1:
+            self._recent.popleft()
+        if (self.rate and len(self._recent) >= self.rate) or \
+                now - self._last_by_chat.get(chat_id, -1e9) < self.chat_interval:
+            self.rejected += 1
+            raise RetryAfter(1)
+        self._recent.append(now)
+        self._last_by_chat[chat_id] = now
+
+
+class Outbox:
+    def __init__(self, bot: Any = None, rate: float = OUTBOX_RATE, chat_interval: float = OUTBOX_CHAT_INTERVAL,
+                 workers: int = OUTBOX_WORKERS, max_retries: int = OUTBOX_MAX_RETRIES):
+        self.bot = bot
+        self.rate = rate
+        self.chat_interval = chat_interval
+        self.workers = workers
+        self.max_retries = max_retries
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._started = threading.Event()
+        # Loop-only state: texts waiting per chat, chats ready to send, and chats that are queued,
+        # sending or cooling down (a chat is in _ready at most once, so it never sends twice at a time)
+        self._pending: Dict[int, List[Tuple[Any, float]]] = {}  # (text or payload, enqueued at)
+        self._busy: Set[int] = set()
+        self._attempts: Dict[int, int] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self.bucket: Optional[TokenBucket] = None
+        self._sending = 0
+        self._tasks: List[asyncio.Task] = []  # Workers
+        self._submitted: Set[asyncio.Task] = set()  # Coroutines from submit() still running
+
+        self.queued = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.dropped = 0
+        self._latencies: deque = deque(maxlen=1000)  # Seconds from enqueue to delivery
+        self._stats_lock = threading.Lock()  # stats() runs on request threads while the loop appends
+
+    # -------------------- PRODUCER SIDE (any thread) --------------------
+
+    def send(self, chat_id: int, message: Any):
+        # message is a text, or an object with async deliver(bot, chat_id)
+        self.start()
+        try:
+            self._loop.call_soon_threadsafe(self._enqueue, int(chat_id), message, time.monotonic())
+        except RuntimeError:
+            logging.warning(f"⚠️ Outbox stopped, dropping message to {chat_id}")
+
+    def submit(self, coro) -> Optional[concurrent.futures.Future]:
+        # Runs a coroutine on the outbox loop, where it shares self.bot and self.bucket (see broadcast.py).
+        # stop() cancels whatever is still running.
+        self.start()
+        tracked = self._tracked(coro)
+        try:
+            return asyncio.run_coroutine_threadsafe(tracked, self._loop)
+        except RuntimeError:
+            tracked.close()
+            coro.close()
+            logging.warning("⚠️ Outbox stopped, dropping submitted work")
+            return None
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            if self.bot is None:
+                self.bot = self._default_bot()
+            self._thread = threading.Thread(target=self._run, name="telegram-outbox", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        self._started.wait()
+
+    def stop(self, timeout: float = 10.0):
+        # Gives queued messages up to timeout seconds to go out; safe to call twice
+        if self._loop is None or self._loop.is_closed():
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            # Round trip through the loop so sends handed over just before are counted as pending
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0), self._loop).result(timeout)
+        except Exception:
+            pass
+        while self.pending() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self._loop).result(
+                max(1.0, deadline - time.monotonic())
+            )
+        except Exception:
+            logging.warning("⚠️ Outbox tasks did not finish cancelling before shutdown")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=max(0.0, deadline - time.monotonic()) + 1)
+
+    def pending(self) -> int:
+        return sum(len(texts) for texts in list(self._pending.values())) + self._sending
+
+    @staticmethod
+    def _default_bot():
+        if TELEGRAM_BOT_TOKEN:
+            from telegram import Bot
+            return Bot(token=TELEGRAM_BOT_TOKEN)
+        logging.warning("⚠️ TELEGRAM_BOT_TOKEN not set, outbound messages are only logged")
+        return FakeBot(log=True)
+
+    # -------------------- LOOP THREAD --------------------
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._ready = asyncio.Queue()
+        self.bucket = TokenBucket(self.rate)
+        self._tasks = [self._loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._loop.call_soon(self._started.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _tracked(self, coro):
+        task = asyncio.current_task()
+        self._submitted.add(task)
+        try:
+            return await coro
+        finally:
+            self._submitted.discard(task)
+
+    async def _cancel_tasks(self):
+        # Workers and submitted coroutines alike, awaited so none is left pending on a closed loop
+        tasks = self._tasks + list(self._submitted)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _enqueue(self, chat_id: int, message: Any, queued_at: float):
+        self.queued += 1
+        self._pending.setdefault(chat_id, []).append((message, queued_at))
+        if chat_id not in self._busy:
+            self._busy.add(chat_id)
+            self._ready.put_nowait(chat_id)
+
+    def _release(self, chat_id: int):
+        # End of a chat's cooldown: send what arrived meanwhile, or forget the chat
+        if self._pending.get(chat_id):
+            self._ready.put_nowait(chat_id)
+        else:
+            self._pending.pop(chat_id, None)
+            self._busy.discard(chat_id)
+
+    def _take_batch(self, chat_id: int) -> List[Tuple[Any, float]]:
+        # As many consecutive waiting texts as fit in one message, oldest first; payloads go alone
+        waiting = self._pending[chat_id]
+        batch = [waiting[0]]
+        if isinstance(waiting[0][0], str):
+            length = len(waiting[0][0])
+            for item in waiting[1:]:
+                if not isinstance(item[0], str):
+                    break
+                length += len(BATCH_SEPARATOR) + len(item[0])
+                if length > MAX_MESSAGE_LENGTH:
+                    break
+                batch.append(item)
+        del waiting[:len(batch)]
+        return batch
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._ready.get()
+            batch = self._take_batch(chat_id)
+            self._sending += len(batch)
+            try:
+                delay = await self._deliver(chat_id, batch)
+            except Exception:
+                logging.exception(f"❌ Outbox failed to send to {chat_id}")
+                self.dropped += len(batch)
+                delay = self.chat_interval
+            finally:
+                self._sending -= len(batch)
+            self._loop.call_later(delay, self._release, chat_id)
+
+    async def _deliver(self, chat_id: int, batch: List[Tuple[Any, float]]) -> float:
+        # Sends one batch; returns how long the chat should wait before its next send
+        await self.bucket.acquire()
+        try:
+            if isinstance(batch[0][0], str):
+                await self.bot.send_message(chat_id=chat_id, text=BATCH_SEPARATOR.join(text for text, _ in batch))
+            else:
+                await batch[0][0].deliver(self.bot, chat_id)
+        except RetryAfter as e:
+            retry_after = float(e.retry_after)
+            logging.warning(f"🚦 Telegram flood control, pausing sends for {retry_after:.1f}s")
+            self.bucket.pause(retry_after)
+            self.retried += 1
+            self._requeue(chat_id, batch)
+            return retry_after
+        except (Forbidden, BadRequest) as e:
+            # Blocked the bot, deleted account or bad chat id: retrying will not help
+            logging.info(f"🚫 Dropping {len(batch)} message(s) to {chat_id}: {e}")
+            self._attempts.pop(chat_id, None)
+            self.dropped += len(batch)
+            return self.chat_interval
+        except NetworkError as e:
+            attempts = self._attempts.get(chat_id, 0) + 1
+            if attempts > self.max_retries:
+                logging.warning(f"⚠️ Giving up on {len(batch)} message(s) to {chat_id} after {attempts} attempts: {e}")
+                self._attempts.pop(chat_id, None)
+                self.dropped += len(batch)
+                return self.chat_interval
+            self._attempts[chat_id] = attempts
+            self.retried += 1
+            self._requeue(chat_id, batch)
+            return min(MAX_BACKOFF, self.chat_interval * 2 ** attempts)
+
+        self._attempts.pop(chat_id, None)
+        self.sent += 1
+        self.coalesced += len(batch) - 1
+        now = time.monotonic()
+        with self._stats_lock:
+            self._latencies.extend(now - queued_at for _, queued_at in batch)
+        return self.chat_interval
+
+    def _requeue(self, chat_id: int, batch: List[Tuple[Any, float]]):
+        self._pending[chat_id][:0] = batch
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+
+        def pct(p: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else 0
+
+        return {
+            "queued": self.queued,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "pending": self.pending(),
+            "chats_waiting": len(self._busy),
+            "delivery_ms": {"p50": pct(0.50), "p99": pct(0.99)},
+        }
+
+
+outbox = Outbox()
@@ -0,0 +1,324 @@
+# persistence.py — write-behind saving of live games to Game/GameParticipant rows
+#
+# Games are marked dirty by their event log and flushed by one background thread in batched
+# upserts, at the latest PERSIST_INTERVAL_MS after a change or sooner after PERSIST_MAX_EVENTS
+# events. A crash therefore loses at most that window; restore() rebuilds the registry on startup.
+#
+# Room ids come from the database: a new room first inserts its Game row, so its id can never be
+# one the admin panel already uses, and later flushes only UPDATE rows this process created or
+# restored. Players are Telegram ids in the game; rows store that as telegram_id and the matching
+# User.id, when there is one, as user_id.
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select, update
+
+import bitmask
+from config import PERSIST_INTERVAL_MS, PERSIST_MAX_EVENTS
+from game_logic import BingoGame, FREE_CELL
+from models import db, Game, GameParticipant, User
+from registry import GameRegistry
+
+LIVE_STATUSES = ("waiting", "active")
+
+
+def _upsert(model, rows: List[Dict[str, Any]], keys: List[str], update: List[str]):
+    if not rows:
+        return
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        for row in rows:
+            db.session.merge(model(**row))
+        return
+    stmt = insert(model.__table__)
+    stmt = stmt.on_conflict_do_update(index_elements=keys, set_={name: stmt.excluded[name] for name in update})
+    db.session.execute(stmt, rows)
+
+
+def snapshot(game: BingoGame) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    # Game row plus one participant row per cartela; taken under the game lock, written without it
+    now = datetime.utcnow()
+    called_lo, called_hi = bitmask.split(bitmask.from_numbers(game.called_numbers))
+    manual_lo, manual_hi = bitmask.split(bitmask.from_numbers(game.manual_numbers))
+    game_row = {
+        "id": game.game_id,
+        "status": game.status,
+        "entry_price": game.entry_price,
+        "pool": game.pool,
+        "payout": next(iter(game.payouts.values()), 0),
+        "commission": game.admin_earnings,
+        "called_lo": called_lo,
+        "called_hi": called_hi,
+        "call_sequence": bitmask.pack_sequence(game.called_numbers),
+        "manual_lo": manual_lo,
+        "manual_hi": manual_hi,
+        "seed": game.seed,
+        "winner_id": None,  # Filled in from winner_telegram_id when written
+        "winner_telegram_id": game.winner_id,
+        "created_at": game.created_at,
+        "finished_at": game.finished_at,
+        "updated_at": now,
+    }
+    participant_rows = []
+    for cartela in game.cartelas:
+        if cartela is None:
+            continue
+        mask = cartela.mask
+        marked = bitmask.from_numbers(
+            number for cell, number in enumerate(cartela.board) if cell != FREE_CELL and mask >> cell & 1
+        )
+        marked_lo, marked_hi = bitmask.split(marked)
+        participant_rows.append({
+            "game_id": game.game_id,
+            "user_id": None,
+            "telegram_id": cartela.owner,
+            "cartela_number": cartela.number,
+            "cartela_count": 1,
+            "marked_lo": marked_lo,
+            "marked_hi": marked_hi,
+            "created_at": now,
+        })
+    return game_row, participant_rows
+
+
+class GamePersister:
+    def __init__(self, app, interval_ms: int = PERSIST_INTERVAL_MS, max_events: int = PERSIST_MAX_EVENTS):
+        self.app = app
+        self.interval = interval_ms / 1000
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        # One flush at a time, so an older snapshot can never be written over a newer one
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._dirty: Dict[int, BingoGame] = {}
+        self._dirty_since: Optional[float] = None
+        self._pending_events = 0
+        # Cartela numbers last written per game, to delete rows of players who left
+        self._flushed_cartelas: Dict[int, Set[int]] = {}
+        # Game rows this process inserted or restored; no other row is ever written
+        self._owned: Set[int] = set()
+        self._thread: Optional[threading.Thread] = None
+
+        self.flushes = 0
+        self.failures = 0
+        self.rows_written = 0
+        self._latencies: deque = deque(maxlen=1000)  # Seconds per flush
+        self._batch_sizes: deque = deque(maxlen=1000)  # Games per flush
+
+    def attach(self, registry: GameRegistry):
+        # Tracks every game the registry takes in from now on and hands out its ids; call before restore()
+        registry.add_listeners.append(self.track)
+        registry.next_id = self.insert_game
+
+    def insert_game(self, entry_price: int) -> int:
+        # The Game row is written up front so the database picks the id
+        with self.app.app_context():
+            row = Game(status="waiting", entry_price=entry_price)
+            db.session.add(row)
+            db.session.commit()
+            game_id = row.id
+        with self._lock:
+            self._owned.add(game_id)
+        return game_id
+
+    def track(self, game: BingoGame):
+        game.events.subscribers.append(lambda event: self.mark_dirty(game))
+        self.mark_dirty(game)
+
+    def mark_dirty(self, game: BingoGame):
+        with self._lock:
+            self._dirty[game.game_id] = game
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+            self._pending_events += 1
+            if self._pending_events >= self.max_events:
+                self._wake.set()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="game-persister", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        # Final flush on shutdown; safe to call twice
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=10)
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("❌ Game persistence flush failed")
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        with self._lock:
+            dirty = list(self._dirty.values())
+            self._dirty.clear()
+            self._dirty_since = None
+            self._pending_events = 0
+        if not dirty:
+            return 0
+
+        game_rows, participant_rows = [], []
+        for game in dirty:
+            with game.lock:
+                game_row, rows = snapshot(game)
+            game_rows.append(game_row)
+            participant_rows.extend(rows)
+
+        started = time.perf_counter()
+        try:
+            with self.app.app_context():
+                self._write(game_rows, participant_rows)
+        except Exception:
+            self.failures += 1
+            # Put the games back so the next flush retries them; nothing newer is overwritten
+            with self._lock:
+                for game in dirty:
+                    self._dirty.setdefault(game.game_id, game)
+                if self._dirty_since is None:
+                    self._dirty_since = time.monotonic()
+            raise
+
+        elapsed = time.perf_counter() - started
+        rows = len(game_rows) + len(participant_rows)
+        with self._lock:
+            self.flushes += 1
+            self.rows_written += rows
+            self._latencies.append(elapsed)
+            self._batch_sizes.append(len(game_rows))
+        return len(game_rows)
+
+    def _write(self, game_rows: List[Dict[str, Any]], participant_rows: List[Dict[str, Any]]):
+        with self._lock:
+            foreign = [row["id"] for row in game_rows if row["id"] not in self._owned]
+        if foreign:
+            logging.warning(f"⚠️ Not saving game(s) {foreign}: their Game rows were not created by this process")
+            game_rows = [row for row in game_rows if row["id"] not in foreign]
+            participant_rows = [row for row in participant_rows if row["game_id"] not in foreign]
+            if not game_rows:
+                return
+        try:
+            # One lookup per flush for the User.id foreign keys; players without a User row get NULL
+            telegram_ids = {row["telegram_id"] for row in participant_rows}
+            telegram_ids.update(row["winner_telegram_id"] for row in game_rows if row["winner_telegram_id"])
+            user_ids = dict(db.session.execute(
+                select(User.telegram_id, User.id).where(User.telegram_id.in_(telegram_ids))
+            ).all()) if telegram_ids else {}
+            for row in game_rows:
+                row.pop("created_at")
+                row["winner_id"] = user_ids.get(row["winner_telegram_id"])
+            for row in participant_rows:
+                row["user_id"] = user_ids.get(row["telegram_id"])
+
+            db.session.execute(update(Game), game_rows)
+            _upsert(GameParticipant, participant_rows, ["game_id", "cartela_number"],
+                    ["user_id", "telegram_id", "marked_lo", "marked_hi"])
+
+            current: Dict[int, Set[int]] = {row["id"]: set() for row in game_rows}
+            for row in participant_rows:
+                current[row["game_id"]].add(row["cartela_number"])
+            for game_id, numbers in current.items():
+                gone = self._flushed_cartelas.get(game_id, set()) - numbers
+                if gone:
+                    GameParticipant.query.filter(
+                        GameParticipant.game_id == game_id,
+                        GameParticipant.cartela_number.in_(gone)
+                    ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        for row in game_rows:
+            if row["status"] in LIVE_STATUSES:
+                self._flushed_cartelas[row["id"]] = current[row["id"]]
+            else:
+                self._flushed_cartelas.pop(row["id"], None)
+
+    def restore(self, registry: GameRegistry) -> int:
+        # Rebuilds waiting and active games, resumes their draws and keeps new ids past the stored ones
+        with self.app.app_context():
+            last_id = db.session.execute(select(func.max(Game.id))).scalar() or 0
+            registry.reserve_ids(last_id)
+
+            games = Game.query.filter(Game.status.in_(LIVE_STATUSES)).order_by(Game.id).all()
+            if not games:
+                return 0
+            participants: Dict[int, List[GameParticipant]] = {game.id: [] for game in games}
+            for participant in (
+                GameParticipant.query
+                .filter(GameParticipant.game_id.in_(participants))
+                .order_by(GameParticipant.id)
+            ):
+                participants[participant.game_id].append(participant)
+
+            restored = []
+            for row in games:
+                if not row.seed:
+                    logging.warning(f"⚠️ Game {row.id} has no draw seed and cannot be resumed")
+                    continue
+                game = BingoGame.restore(
+                    row.id, row.entry_price, row.seed, row.status, row.pool or 0,
+                    row.called_numbers, row.manual_numbers,
+                    # Rows saved before telegram_id existed hold the Telegram id in user_id
+                    [(p.telegram_id if p.telegram_id is not None else p.user_id, p.cartela_number, p.marked_numbers)
+                     for p in participants[row.id]],
+                    created_at=row.created_at
+                )
+                self._flushed_cartelas[row.id] = {p.cartela_number for p in participants[row.id]}
+                with self._lock:
+                    self._owned.add(row.id)
+                restored.append(game)
+
+        for game in restored:
+            registry.add(game)
+            if game.status == "active":
+                game.schedule_next_call(None, None)
+        logging.info(f"♻️ Restored {len(restored)} game(s) from the database")
+        return len(restored)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            sizes = self._batch_sizes
+            oldest = time.monotonic() - self._dirty_since if self._dirty_since is not None else 0
+
+            def pct(p: float) -> float:
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else 0
+
+            return {
+                "flushes": self.flushes,
+                "failures": self.failures,
+                "rows_written": self.rows_written,
+                "dirty_games": len(self._dirty),
+                "pending_events": self._pending_events,
+                "oldest_unsaved_ms": round(oldest * 1000, 1),
+                "max_loss_window_ms": round(self.interval * 1000),
+                "flush_ms": {"last": round(self._latencies[-1] * 1000, 2) if self._latencies else 0,
+                             "p50": pct(0.50), "p99": pct(0.99)},
+                "batch_games": {"last": sizes[-1] if sizes else 0, "max": max(sizes, default=0)},
+            }
@@ -0,0 +1,166 @@
+# registry.py
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from config import MAX_LIVE_GAMES, FINISHED_GAME_TTL, MAX_FINISHED_GAMES, WAITING_GAME_TTL
+from game_logic import BingoGame
+
+STATUSES = ("waiting", "active", "finished")
+
+
+class RegistryFull(Exception):
+    pass
+
+
+class GameRegistry:
+    # In-memory rooms with monotonic IDs, per-status indexes and eviction of finished and idle waiting games
+
+    def __init__(self, max_live: int = MAX_LIVE_GAMES, finished_ttl: float = FINISHED_GAME_TTL,
+                 max_finished: int = MAX_FINISHED_GAMES, waiting_ttl: float = WAITING_GAME_TTL, first_id: int = 1):
+        self.max_live = max_live
+        self.finished_ttl = finished_ttl
+        self.max_finished = max_finished
+        self.waiting_ttl = waiting_ttl
+        self._lock = threading.RLock()
+        self._ids = itertools.count(first_id)
+        # Called with the entry price for each new room's id; the persister swaps in one backed by the database
+        self.next_id: Callable[[int], int] = lambda entry_price: next(self._ids)
+        self._creating = 0  # Rooms between their capacity check and add()
+        self._games: Dict[int, BingoGame] = {}
+        # Id -> monotonic time, oldest first: when a game finished, or when a waiting room last
+        # had a player join or leave
+        self._by_status: Dict[str, "OrderedDict[int, float]"] = {status: OrderedDict() for status in STATUSES}
+        # Called as listener(game, old_status, new_status) for every registered game
+        self.listeners: List[Callable[[BingoGame, Optional[str], str], None]] = []
+        # Called with each game as it is registered, whether created here or restored
+        self.add_listeners: List[Callable[[BingoGame], None]] = []
+
+    def create(self, entry_price: int = 10) -> BingoGame:
+        # The slot is reserved under the lock, but the id is allocated outside it: next_id may be a
+        # database insert, and joins and status changes in every room need this lock meanwhile
+        with self._lock:
+            self.evict()
+            if self.live_count() + self._creating >= self.max_live:
+                raise RegistryFull(f"Live game limit of {self.max_live} reached")
+            self._creating += 1
+        try:
+            game = BingoGame(game_id=self.next_id(entry_price), entry_price=entry_price)
+            self.add(game)
+        finally:
+            with self._lock:
+                self._creating -= 1
+        return game
+
+    def reserve_ids(self, last_id: int):
+        # Continue numbering after ids already used by persisted games
+        with self._lock:
+            self._ids = itertools.count(max(last_id + 1, max(self._games, default=0) + 1))
+
+    def add(self, game: BingoGame):
+        with self._lock:
+            self._games[game.game_id] = game
+            self._index(game.game_id, game.status)
+            game.status_listeners.append(self._on_status)
+        game.events.subscribers.append(lambda event: self._on_event(game, event))
+        for listener in self.add_listeners:
+            listener(game)
+
+    def remove(self, game_id: int) -> Optional[BingoGame]:
+        with self._lock:
+            game = self._games.pop(game_id, None)
+            if game is not None:
+                for ids in self._by_status.values():
+                    ids.pop(game_id, None)
+                game.status_listeners.remove(self._on_status)
+            return game
+
+    def get(self, game_id: int) -> Optional[BingoGame]:
+        return self._games.get(game_id)
+
+    def __contains__(self, game_id: int) -> bool:
+        return game_id in self._games
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def values(self) -> List[BingoGame]:
+        return list(self._games.values())
+
+    def by_status(self, status: str) -> List[BingoGame]:
+        with self._lock:
+            if status == "finished":
+                self.evict()
+            return [self._games[game_id] for game_id in self._by_status.get(status, ())]
+
+    def live_count(self) -> int:
+        return len(self._by_status["waiting"]) + len(self._by_status["active"])
+
+    def counts(self) -> Dict[str, int]:
+        return {status: len(ids) for status, ids in self._by_status.items()}
+
+    def evict(self) -> int:
+        # Finished games go after FINISHED_GAME_TTL, or oldest-first once over MAX_FINISHED_GAMES;
+        # waiting rooms nobody joined or left for WAITING_GAME_TTL are closed as "expired"
+        with self._lock:
+            now = time.monotonic()
+            finished = self._by_status["finished"]
+            cutoff = now - self.finished_ttl
+            evicted = 0
+            while finished:
+                game_id, finished_at = next(iter(finished.items()))
+                if finished_at > cutoff and len(finished) <= self.max_finished:
+                    break
+                self.remove(game_id)
+                evicted += 1
+
+            cutoff = now - self.waiting_ttl
+            expired = 0
+            for game_id, idle_since in list(self._by_status["waiting"].items()):
+                if idle_since > cutoff:
+                    break
+                game = self._games[game_id]
+                # A room whose lock is held is being joined right now, so it is not idle
+                if not game.lock.acquire(blocking=False):
+                    continue
+                try:
+                    self.remove(game_id)
+                    # Saved by the persister like any status change, so a restart does not reopen it
+                    game.status = "expired"
+                finally:
+                    game.lock.release()
+                expired += 1
+
+            if evicted:
+                logging.info(f"🧹 Evicted {evicted} finished game(s)")
+            if expired:
+                logging.info(f"🧹 Closed {expired} idle waiting game(s)")
+            return evicted + expired
+
+    def _index(self, game_id: int, status: str):
+        for ids in self._by_status.values():
+            ids.pop(game_id, None)
+        if status in self._by_status:
+            self._by_status[status][game_id] = time.monotonic()
+
+    def _on_event(self, game: BingoGame, event):
+        # A join or leave keeps a waiting room open for another WAITING_GAME_TTL
+        if event.type != "players":
+            return
+        with self._lock:
+            waiting = self._by_status["waiting"]
+            if game.game_id in waiting:
+                waiting[game.game_id] = time.monotonic()
+                waiting.move_to_end(game.game_id)
+
+    def _on_status(self, game: BingoGame, old: Optional[str], new: str):
+        with self._lock:
+            if game.game_id in self._games:
+                self._index(game.game_id, new)
+                if new == "finished" and len(self._by_status["finished"]) > self.max_finished:
+                    self.evict()
+        for listener in self.listeners:
+            listener(game, old, new)
@@ -0,0 +1,103 @@
+# scheduler.py
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+
+class CallScheduler:
+    # One worker thread drives every game's next auto-call from a heap of due times
+
+    def __init__(self, lag_samples: int = 1000):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._jobs: Dict[Hashable, Tuple[int, float, Callable[[], Any]]] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._lags = deque(maxlen=lag_samples)
+        self.ticks = 0
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable[[], Any]):
+        # Replaces any pending job for the same key
+        with self._cond:
+            seq = next(self._seq)
+            due = time.monotonic() + delay
+            self._jobs[key] = (seq, due, callback)
+            heapq.heappush(self._heap, (due, seq, key))
+            self._ensure_worker()
+            self._cond.notify()
+
+    def cancel(self, key: Hashable) -> bool:
+        with self._cond:
+            return self._jobs.pop(key, None) is not None
+
+    def is_scheduled(self, key: Hashable) -> bool:
+        return key in self._jobs
+
+    @property
+    def games(self) -> int:
+        return len(self._jobs)
+
+    def stats(self) -> Dict[str, Any]:
+        # Copied under the lock; the worker appends to the deque while it is being read otherwise
+        with self._cond:
+            samples = list(self._lags)
+            games = len(self._jobs)
+            ticks = self.ticks
+        lags = sorted(samples)
+
+        def pct(p: float) -> float:
+            return round(lags[min(len(lags) - 1, int(p * len(lags)))] * 1000, 2) if lags else 0.0
+
+        return {
+            "games": games,
+            "ticks": ticks,
+            "lag_ms_last": round(samples[-1] * 1000, 2) if samples else 0.0,
+            "lag_ms_p50": pct(0.50),
+            "lag_ms_p99": pct(0.99),
+            "lag_ms_max": round(lags[-1] * 1000, 2) if lags else 0.0,
+        }
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="call-scheduler", daemon=True)
+            self._thread.start()
+
+    def _next_due(self):
+        # Drops heap entries that were cancelled or rescheduled since they were pushed
+        while self._heap:
+            due, seq, key = self._heap[0]
+            job = self._jobs.get(key)
+            if job and job[0] == seq:
+                return due, key
+            heapq.heappop(self._heap)
+        return None, None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    due, key = self._next_due()
+                    if key is None:
+                        self._cond.wait()
+                        continue
+                    wait = due - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                heapq.heappop(self._heap)
+                _, _, callback = self._jobs.pop(key)
+                self._lags.append(time.monotonic() - due)
+                self.ticks += 1
+
+            try:
+                callback()
+            except Exception:
+                logging.exception(f"❌ Scheduled call for {key!r} failed")
+
+
+# ⏱️ Shared scheduler for all games in this process
+call_scheduler = CallScheduler()
@@ -0,0 +1,206 @@
+# simulate.py — Monte Carlo economics and pacing for BingoGame
+#
+# Usage:
+#   python simulate.py --rooms 1,10,100,500 --games 100000 --out sim.jsonl
+#   python simulate.py --games 20000 --baseline sim.jsonl --tolerance 0.05   # regression check
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from cartelas import CartelaCatalogue
+from config import CARTELA_SIZE
+from game_logic import BingoGame, WIN_PATTERNS
+
+DEFAULT_ROOMS = "1,5,10,25,50,100,200,500"
+PATTERN_NAMES = {message: message.split()[2].lower() for message, _ in WIN_PATTERNS}
+
+_catalogue: Optional[CartelaCatalogue] = None
+
+
+def _init_worker(catalogue_size: int):
+    global _catalogue
+    _catalogue = CartelaCatalogue.generate(catalogue_size)
+
+
+def empty_stats(room_size: int) -> Dict[str, Any]:
+    return {
+        "room_size": room_size,
+        "games": 0,
+        "draws": [0] * 76,
+        "patterns": {name: 0 for name in PATTERN_NAMES.values()},
+        "winners": {},
+        "pool": 0,
+        "commission": 0,
+    }
+
+
+def merge_stats(total: Dict[str, Any], part: Dict[str, Any]):
+    total["games"] += part["games"]
+    total["draws"] = [a + b for a, b in zip(total["draws"], part["draws"])]
+    for name, count in part["patterns"].items():
+        total["patterns"][name] += count
+    for winners, count in part["winners"].items():
+        total["winners"][winners] = total["winners"].get(winners, 0) + count
+    total["pool"] += part["pool"]
+    total["commission"] += part["commission"]
+
+
+def play_game(room_size: int, seed: str, catalogue: CartelaCatalogue) -> BingoGame:
+    # Manual-mode players keep the scheduler out of it, and no chat/context means no audio or Telegram
+    game = BingoGame(game_id=0, seed=seed, catalogue=catalogue)
+    game.min_players = room_size
+    for user_id in range(1, room_size + 1):
+        game.add_player(user_id, mode="manual")
+    while game.status == "active":
+        game.auto_call(None, None)
+    return game
+
+
+def run_batch(room_size: int, first: int, count: int, seed: str) -> Dict[str, Any]:
+    stats = empty_stats(room_size)
+    for index in range(first, first + count):
+        game = play_game(room_size, f"{seed}:{room_size}:{index}", _catalogue)
+        stats["games"] += 1
+        stats["draws"][len(game.called_numbers)] += 1
+        for _, _, message in game.wins:
+            stats["patterns"][PATTERN_NAMES[message]] += 1
+        winners = str(len(game.winner_ids))
+        stats["winners"][winners] = stats["winners"].get(winners, 0) + 1
+        stats["pool"] += game.pool
+        stats["commission"] += game.admin_earnings
+    return stats
+
+
+def summarize(stats: Dict[str, Any]) -> Dict[str, Any]:
+    games = stats["games"] or 1
+    draws = stats["draws"]
+    mean = sum(n * c for n, c in enumerate(draws)) / games
+
+    def percentile(p: float) -> int:
+        seen = 0
+        for n, c in enumerate(draws):
+            seen += c
+            if seen >= p * games:
+                return n
+        return 75
+
+    wins = sum(stats["patterns"].values()) or 1
+    multi = sum(c for w, c in stats["winners"].items() if int(w) > 1)
+    return {
+        **stats,
+        "mean_draws": round(mean, 3),
+        "p50_draws": percentile(0.50),
+        "p99_draws": percentile(0.99),
+        "pattern_share": {name: round(c / wins, 4) for name, c in stats["patterns"].items()},
+        "multi_winner_rate": round(multi / games, 4),
+        "commission_yield": round(stats["commission"] / stats["pool"], 4) if stats["pool"] else 0.0,
+    }
+
+
+class ResultWriter:
+    # JSON lines: one summary object per room size; CSV: long format room_size,histogram,bucket,value
+
+    def __init__(self, stream, fmt: str):
+        self.stream = stream
+        self.fmt = fmt
+        self.writer = csv.writer(stream) if fmt == "csv" else None
+        if self.writer:
+            self.writer.writerow(["room_size", "histogram", "bucket", "value"])
+
+    def write(self, row: Dict[str, Any]):
+        if self.writer is None:
+            self.stream.write(json.dumps(row) + "\n")
+        else:
+            room = row["room_size"]
+            for key in ("games", "mean_draws", "p50_draws", "p99_draws", "multi_winner_rate", "commission_yield"):
+                self.writer.writerow([room, "summary", key, row[key]])
+            for n, count in enumerate(row["draws"]):
+                if count:
+                    self.writer.writerow([room, "draws", n, count])
+            for name, count in row["patterns"].items():
+                self.writer.writerow([room, "patterns", name, count])
+            for winners, count in sorted(row["winners"].items(), key=lambda item: int(item[0])):
+                self.writer.writerow([room, "winners", winners, count])
+        self.stream.flush()
+
+
+def simulate(rooms: List[int], games: int, workers: int, batch: int, seed: str, writer: ResultWriter) -> List[Dict[str, Any]]:
+    totals = {room: empty_stats(room) for room in rooms}
+    pending = {room: 0 for room in rooms}
+    results = []
+    catalogue_size = max(CARTELA_SIZE, max(rooms))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(catalogue_size,)) as pool:
+        futures = []
+        for room in rooms:
+            for first in range(0, games, batch):
+                futures.append(pool.submit(run_batch, room, first, min(batch, games - first), seed))
+                pending[room] += 1
+
+        # Emit each room size as soon as its last batch lands
+        for future in as_completed(futures):
+            part = future.result()
+            room = part["room_size"]
+            merge_stats(totals[room], part)
+            pending[room] -= 1
+            if not pending[room]:
+                row = summarize(totals[room])
+                writer.write(row)
+                results.append(row)
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path) as f:
+        baseline = {row["room_size"]: row for row in map(json.loads, f) if row}
+
+    failures = []
+    for row in results:
+        base = baseline.get(row["room_size"])
+        if not base:
+            continue
+        if abs(row["mean_draws"] - base["mean_draws"]) > tolerance * base["mean_draws"]:
+            failures.append(f"room {row['room_size']}: mean draws {row['mean_draws']} vs {base['mean_draws']}")
+        for name, share in row["pattern_share"].items():
+            if abs(share - base["pattern_share"].get(name, 0.0)) > tolerance:
+                failures.append(f"room {row['room_size']}: {name} share {share} vs {base['pattern_share'].get(name)}")
+        if abs(row["commission_yield"] - base["commission_yield"]) > tolerance:
+            failures.append(f"room {row['room_size']}: commission {row['commission_yield']} vs {base['commission_yield']}")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate BingoGame rounds and aggregate pacing and payout statistics.")
+    parser.add_argument("--rooms", default=DEFAULT_ROOMS, help="comma-separated cartelas per room")
+    parser.add_argument("--games", type=int, default=10000, help="games per room size")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch", type=int, default=500, help="games per worker task")
+    parser.add_argument("--seed", default="sim")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--out", help="output file (default stdout)")
+    parser.add_argument("--baseline", help="JSON lines from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    rooms = sorted({int(r) for r in args.rooms.split(",") if r.strip()})
+    stream = open(args.out, "w", newline="") if args.out else sys.stdout
+    try:
+        results = simulate(rooms, args.games, args.workers, args.batch, args.seed, ResultWriter(stream, args.format))
+    finally:
+        if args.out:
+            stream.close()
+
+    if args.baseline:
+        failures = compare(results, args.baseline, args.tolerance)
+        for failure in failures:
+            print(f"❌ {failure}", file=sys.stderr)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+# test_app.py — HTTP routes against a throwaway SQLite database (run with: python -m pytest)
+import itertools
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+TMP = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(TMP, "test.db")
+os.environ["AUDIO_FILE_IDS_FILE"] = os.path.join(TMP, "audio_file_ids.json")
+
+import pytest
+
+from app import app, active_games, db, leaderboards, persister, settlements, transaction_counts
+from models import Game, GameParticipant, User, Transaction
+from game_logic import BingoGame
+from registry import GameRegistry
+from leaderboard import LeaderboardService, TopN
+import ledger
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+def started_game():
+    game = active_games.create()
+    game.min_players = 2
+    with game.lock:
+        for user_id in (1, 2):
+            game.add_player(user_id, mode="manual")
+            game.toggle_sound(user_id, False)
+        game.start_game()
+        game.draw()
+    return game
+
+
+def test_state_snapshot_includes_player_marks(client):
+    game = started_game()
+    cartela = game.player_cartelas(1)[0]
+    number = next(n for n in cartela.board if n not in game.called_numbers)
+    with game.lock:
+        game.manual_call(number)
+        assert game.mark_number(1, number)
+
+    data = client.get(f"/game/{game.game_id}/state?user_id=1").get_json()
+    assert data["full"]
+    assert data["seq"] == game.events.seq
+    assert [cartela.number, number] in data["marks"]
+    assert data["marks"] == [[cartela.number, n] for n in cartela.marked()]
+
+
+def test_state_delta_and_etag(client):
+    game = started_game()
+    seq = game.events.seq
+    response = client.get(f"/game/{game.game_id}/state?since={seq}")
+    assert response.get_json() == {"seq": seq, "full": False, "status": "active", "calls": [], "marks": []}
+    assert client.get(f"/game/{game.game_id}/state?since={seq}",
+                      headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+    with game.lock:
+        game.draw()
+    data = client.get(f"/game/{game.game_id}/state?since={seq}").get_json()
+    assert data["seq"] == game.events.seq
+    assert data["calls"] == game.called_numbers[-1:]
+
+
+def test_state_ahead_of_log_gets_snapshot(client):
+    game = started_game()
+    data = client.get(f"/game/{game.game_id}/state?since={game.events.seq + 50}").get_json()
+    assert data["full"]
+    assert data["calls"] == game.called_numbers
+
+
+@pytest.fixture
+def transactions():
+    # 12 rows over 4 timestamps, so pages have to break ties on id
+    with app.app_context():
+        Transaction.query.delete()
+        transaction_counts.clear()
+        user = User.query.filter_by(telegram_id=1001).first() or User(telegram_id=1001, username="pager")
+        db.session.add(user)
+        db.session.flush()
+        start = datetime(2026, 1, 1)
+        for index in range(12):
+            db.session.add(Transaction(user_id=user.id, type="deposit" if index % 2 else "withdraw",
+                                       amount=10 + index, status="pending",
+                                       created_at=start + timedelta(minutes=index // 3)))
+        db.session.commit()
+        return [tx.id for tx in Transaction.query.order_by(Transaction.created_at.desc(), Transaction.id.desc())]
+
+
+def pages(client, **params):
+    ids, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        data = client.get("/admin/transactions", query_string=query).get_json()
+        ids.append([tx["id"] for tx in data["transactions"]])
+        cursor = data["next_cursor"]
+        if not cursor:
+            return ids, data["total"]
+
+
+def test_transactions_cursor_pages(client, transactions):
+    ids, total = pages(client, limit=5)
+    assert [len(page) for page in ids] == [5, 5, 2]
+    assert sum(ids, []) == transactions
+    assert total == 12
+
+
+def test_transactions_cursor_pages_with_filter(client, transactions):
+    ids, total = pages(client, limit=4, type="deposit")
+    assert [len(page) for page in ids] == [4, 2]
+    assert total == 6
+    assert all(tx_id in transactions for tx_id in sum(ids, []))
+
+
+def test_transactions_cursor_exact_page_has_no_next(client, transactions):
+    data = client.get("/admin/transactions", query_string={"limit": 12}).get_json()
+    assert len(data["transactions"]) == 12
+    assert data["next_cursor"] is None
+
+
+def test_transactions_invalid_cursor(client, transactions):
+    assert client.get("/admin/transactions?cursor=bm9wZQ==").status_code == 400
+    assert client.get("/admin/transactions?from=yesterday").status_code == 400
+
+
+telegram_ids = itertools.count(2000)
+
+
+def pending(type: str, amount: float = 50, balance: float = 100) -> int:
+    with app.app_context():
+        user = User(telegram_id=next(telegram_ids), username="wallet", balance=balance)
+        db.session.add(user)
+        db.session.flush()
+        tx = Transaction(user_id=user.id, type=type, amount=amount, status="pending")
+        db.session.add(tx)
+        db.session.commit()
+        return tx.id
+
+
+def balance_of(tx_id: int) -> float:
+    with app.app_context():
+        return float(db.session.get(Transaction, tx_id).user.balance)
+
+
+def test_approve_twice_settles_once(client):
+    tx_id = pending("withdraw")
+    assert client.post(f"/admin/approve/{tx_id}", json={"type": "withdraw"}).status_code == 200
+    assert client.post(f"/admin/approve/{tx_id}", json={"type": "withdraw"}).status_code == 400
+    assert client.post(f"/admin/reject/{tx_id}", json={"type": "withdraw"}).status_code == 400
+    assert balance_of(tx_id) == 50
+
+
+def test_approve_checks_the_type(client):
+    tx_id = pending("deposit")
+    assert client.post(f"/admin/approve/{tx_id}", json={"type": "withdraw"}).status_code == 409
+    assert balance_of(tx_id) == 100
+    assert client.post(f"/admin/approve/{tx_id}?type=deposit").status_code == 200
+    assert balance_of(tx_id) == 150
+
+
+def test_approve_without_type_uses_the_stored_type(client):
+    tx_id = pending("withdraw")
+    assert client.post(f"/admin/approve/{tx_id}").status_code == 200
+    assert balance_of(tx_id) == 50
+    tx_id = pending("deposit")
+    assert client.post(f"/admin/reject/{tx_id}").status_code == 200
+    assert balance_of(tx_id) == 100
+
+
+def test_withdrawal_spelling_is_a_debit(client):
+    tx_id = pending("withdrawal")
+    assert client.post(f"/admin/approve/{tx_id}", json={"type": "withdraw"}).status_code == 200
+    assert balance_of(tx_id) == 50
+
+
+def test_amounts_are_json_numbers(client, transactions):
+    data = client.get("/admin/transactions", query_string={"limit": 1}).get_json()
+    assert data["transactions"][0]["amount"] == 21
+    with app.app_context():
+        user_id = User.query.filter_by(telegram_id=1001).one().id
+    data = client.post("/deposit", json={"user_id": user_id, "amount": 30.10, "method": "telebirr"}).get_json()
+    assert isinstance(data["new_balance"], float)
+
+
+def player(balance: float = 100) -> int:
+    # A funded account; returns its Telegram id, which is how games know players
+    with app.app_context():
+        user = User(telegram_id=next(telegram_ids) + 10**9, username="player", balance=balance)
+        db.session.add(user)
+        db.session.commit()
+        return user.telegram_id
+
+
+def balance_for(telegram_id: int) -> float:
+    settlements.submit(lambda: None).result()  # One worker, so queued refunds have run
+    with app.app_context():
+        return float(User.query.filter_by(telegram_id=telegram_id).one().balance)
+
+
+def test_join_validates_cartela_number(client):
+    game = active_games.create()
+    first, second = player(), player()
+    for bad in ("seven", 0, -3, game.cartela_pool.size + 1, 2.5, True, [4]):
+        response = client.post("/game/join", json={"game_id": game.game_id, "user_id": first, "cartela_number": bad})
+        assert response.status_code == 400, bad
+    assert client.post("/game/join", json={"game_id": game.game_id, "user_id": first, "cartela_number": "7"}).status_code == 200
+    response = client.post("/game/join", json={"game_id": game.game_id, "user_id": second, "cartela_number": 7})
+    assert response.status_code == 409
+    assert response.get_json()["error"] == "Cartela not available"
+    assert client.post("/game/join", json={"game_id": game.game_id, "user_id": first, "cartela_number": 7}).status_code == 409
+    assert (balance_for(first), balance_for(second)) == (90, 100)
+
+
+def test_join_charges_the_entry_fee(client):
+    game = active_games.create(entry_price=10)
+    game.min_players = 100
+    telegram_id = player(balance=15)
+    assert client.post("/game/join", json={"game_id": game.game_id, "user_id": telegram_id}).status_code == 200
+    assert balance_for(telegram_id) == 5
+    response = client.post("/game/join", json={"game_id": game.game_id, "user_id": telegram_id})
+    assert (response.status_code, response.get_json()["error"]) == (400, "Insufficient balance")
+    assert balance_for(telegram_id) == 5
+    assert len(game.player_cartelas(telegram_id)) == 1
+    assert client.post("/game/join", json={"game_id": game.game_id, "user_id": 999}).status_code == 404
+    with app.app_context():
+        fees = Transaction.query.filter_by(type="game_entry", reference=f"game:{game.game_id}").all()
+        assert [(float(tx.amount), tx.status) for tx in fees] == [(10, "completed")]
+
+
+def test_expired_room_refunds_entry_fees(client):
+    game = active_games.create(entry_price=10)
+    game.min_players = 100
+    players = [player(), player()]
+    for telegram_id in players + players[:1]:
+        assert client.post("/game/join", json={"game_id": game.game_id, "user_id": telegram_id}).status_code == 200
+    assert [balance_for(t) for t in players] == [80, 90]
+    with game.lock:
+        active_games.remove(game.game_id)
+        game.status = "expired"
+    assert [balance_for(t) for t in players] == [100, 100]
+    with app.app_context():
+        assert ledger.refund_entries(game.game_id) == {}
+    response = client.post("/game/join", json={"game_id": game.game_id, "user_id": players[0]})
+    assert response.status_code == 404
+
+
+def test_join_reports_the_cartela_cap(client):
+    game = active_games.create()
+    game.min_players = 100
+    telegram_id = player()
+    for _ in range(5):
+        assert client.post("/game/join", json={"game_id": game.game_id, "user_id": telegram_id}).status_code == 200
+    response = client.post("/game/join", json={"game_id": game.game_id, "user_id": telegram_id})
+    assert response.status_code == 409
+    assert "maximum" in response.get_json()["error"]
+
+
+def test_persisted_players_keep_telegram_ids(client):
+    with app.app_context():
+        user = User(telegram_id=next(telegram_ids) + 10**9, username="known")
+        db.session.add(user)
+        db.session.commit()
+        known_user, known_telegram = user.id, user.telegram_id
+    game = active_games.create()
+    game.min_players = 100
+    with game.lock:
+        game.add_player(known_telegram, mode="manual")
+        game.add_player(5_000_000_000, mode="manual")  # No User row, and too big for an Integer column
+    persister.flush()
+
+    with app.app_context():
+        rows = {p.telegram_id: p.user_id for p in GameParticipant.query.filter_by(game_id=game.game_id)}
+        assert rows == {known_telegram: known_user, 5_000_000_000: None}
+        assert db.session.get(Game, game.game_id).status == "waiting"
+
+    restored = GameRegistry()
+    persister.restore(restored)
+    assert sorted(restored.get(game.game_id).players) == sorted(game.players)
+
+
+def test_persister_leaves_other_game_rows_alone(client):
+    # e.g. a game the admin panel created with an id this process never handed out
+    with app.app_context():
+        row = Game(status="active", entry_price=99)
+        db.session.add(row)
+        db.session.commit()
+        game_id = row.id
+    game = BingoGame(game_id=game_id, entry_price=10)
+    active_games.add(game)
+    persister.flush()
+    active_games.remove(game_id)
+
+    with app.app_context():
+        row = db.session.get(Game, game_id)
+        assert (row.status, row.entry_price) == ("active", 99)
+        assert not GameParticipant.query.filter_by(game_id=game_id).count()
+
+
+def test_settlement_pays_winners_and_feeds_the_leaderboard(client):
+    game = active_games.create()
+    game.min_players = 100
+    players = [next(telegram_ids) + 10**9 for _ in range(60)]
+    with app.app_context():
+        for telegram_id in players[:-1]:  # The last player has no account
+            db.session.add(User(telegram_id=telegram_id, username=f"p{telegram_id}"))
+        db.session.commit()
+        accounts = dict(db.session.execute(db.select(User.telegram_id, User.id)).all())
+        leaderboards.top("all")
+    with game.lock:
+        for telegram_id in players:
+            game.add_player(telegram_id, mode="manual")
+        game.start_game()
+        while game.status == "active":
+            game.draw()
+    settlements.submit(lambda: None).result()  # One worker, so this waits for the payout
+
+    with app.app_context():
+        wins = Transaction.query.filter_by(type="jackpot_win", reference=f"game:{game.game_id}").all()
+        paid = {tx.user_id: float(tx.amount) for tx in wins}
+        expected = {accounts[t]: payout for t, payout in game.payouts.items() if t in accounts}
+        assert paid == expected
+        assert paid or set(game.payouts) == {players[-1]}
+        for user_id, amount in paid.items():
+            user = db.session.get(User, user_id)
+            assert (float(user.balance), user.games_won, user.games_played) == (amount, 1, 1)
+        assert ledger.settle_game(game.game_id, game.payouts, game.players) == {}
+
+    with app.app_context():
+        board = {row["user_id"]: row for row in leaderboards.top("all")}
+    for user_id, amount in paid.items():
+        assert board[user_id]["earnings"] >= amount
+    top = {row["user_id"]: row for row in client.get("/leaderboard/top?window=daily").get_json()}
+    for user_id, amount in paid.items():
+        assert top[user_id]["earnings"] >= amount
+    assert client.get("/leaderboard/top?window=hourly").status_code == 400
+    rows = client.get("/leaderboard").get_json()
+    assert rows and all(set(row) == {"username", "wins", "balance"} for row in rows)
+    assert client.get("/leaderboard/page").status_code == 200
+
+
+def test_record_win_for_unranked_player_reloads():
+    service = LeaderboardService(size=1, ttl=3600)
+    board = TopN(1)
+    board.add(1, 5, 500)
+    service._boards["all"] = (None, float("inf"), board)
+    service.record_win(1, 100)
+    assert board.totals[1] == [6, 600]
+    service.record_win(2, 100)
+    assert "all" not in service._boards
+
+
+def test_streams_are_kept_out_of_request_latency(client):
+    game = active_games.create()
+    game.status = "finished"
+    body = client.get(f"/game/{game.game_id}/stream").get_data(as_text=True)
+    assert "event: end" in body
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'bingo_http_stream_duration_seconds_count{endpoint="/game/<int:game_id>/stream",method="GET"}' in text
+    assert 'bingo_http_request_duration_seconds_count{endpoint="/game/<int:game_id>/stream"' not in text
+    assert "bingo_draws_total" in text
+    assert "bingo_draws_per_second" not in text
@@ -0,0 +1,39 @@
+# test_audio_catalogue.py — file_id store shared between processes (run with: python -m pytest)
+import json
+
+from audio_catalogue import AudioCatalogue
+
+
+def catalogues(tmp_path, count=2):
+    # Separate instances stand in for separate processes sharing one file
+    path = str(tmp_path / "ids.json")
+    return path, [AudioCatalogue(directory=str(tmp_path), ids_file=path, bot_id="42") for _ in range(count)]
+
+
+def test_writers_merge_instead_of_overwriting(tmp_path):
+    path, (bot, web) = catalogues(tmp_path)
+    assert bot.file_id("amharic/b1.ogg") is None
+    assert web.file_id("amharic/b2.ogg") is None
+    bot.remember("amharic/b1.ogg", "id-1")
+    web.remember("amharic/b2.ogg", "id-2")
+    with open(path) as f:
+        assert json.load(f) == {"42": {"amharic/b1.ogg": "id-1", "amharic/b2.ogg": "id-2"}}
+
+
+def test_reload_picks_up_other_uploads(tmp_path):
+    _, (bot, web) = catalogues(tmp_path)
+    assert web.file_id("amharic/b1.ogg") is None
+    bot.remember("amharic/b1.ogg", "id-1")
+    assert web.file_id("amharic/b1.ogg") is None
+    assert web.file_id("amharic/b1.ogg", reload=True) == "id-1"
+
+
+def test_forget_keeps_a_newer_id(tmp_path):
+    path, (bot, web) = catalogues(tmp_path)
+    bot.remember("amharic/b1.ogg", "stale")
+    web.remember("amharic/b1.ogg", "fresh")
+    bot.forget("amharic/b1.ogg", "stale")
+    assert bot.file_id("amharic/b1.ogg") == "fresh"
+    web.forget("amharic/b1.ogg", "fresh")
+    with open(path) as f:
+        assert json.load(f) == {"42": {}}
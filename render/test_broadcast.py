@@ -0,0 +1,49 @@
+# test_broadcast.py — Broadcaster fan-out and shutdown (run with: python -m pytest)
+import asyncio
+import time
+
+from broadcast import Broadcaster
+from game_logic import BingoGame
+from outbox import Outbox, FakeBot
+
+
+def room(broadcaster: Broadcaster, players: int) -> BingoGame:
+    game = BingoGame(game_id=1, seed="broadcast")
+    game.min_players = players + 1
+    broadcaster.track(game)
+    for user_id in range(1, players + 1):
+        game.add_player(user_id, mode="manual")
+        game.toggle_sound(user_id, False)
+        game.toggle_notify(user_id, True)
+    game.call_interval = 30
+    game.status = "active"
+    return game
+
+
+def test_draw_reaches_every_player():
+    bot = FakeBot()
+    outbox = Outbox(bot=bot, rate=1000)
+    broadcaster = Broadcaster(outbox=outbox)
+    game = room(broadcaster, 20)
+    number = game.draw()["number"]
+    deadline = time.monotonic() + 2
+    while broadcaster.stats()["draws"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    outbox.stop()
+    assert broadcaster.stats()["announcements"]["sent"] == 20
+    assert sorted(chat_id for _, chat_id, _ in bot.sent) == list(range(1, 21))
+    assert all(str(number) in text for _, _, text in bot.sent)
+
+
+def test_close_cancels_fan_outs_in_flight():
+    outbox = Outbox(bot=FakeBot(latency=0.5), rate=2)
+    broadcaster = Broadcaster(outbox=outbox)
+    game = room(broadcaster, 50)
+    game.draw()
+    time.sleep(0.1)
+    assert broadcaster._fanouts
+    broadcaster.close()
+    assert not broadcaster._fanouts
+    outbox.stop(timeout=0.2)
+    assert not asyncio.all_tasks(outbox._loop)
+    broadcaster.close()
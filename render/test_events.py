@@ -0,0 +1,30 @@
+# test_events.py — GameEventLog paging (run with: python -m pytest)
+from events import GameEventLog
+
+
+def test_since_returns_missing_events():
+    log = GameEventLog()
+    for number in (5, 17, 42):
+        log.publish("call", {"number": number})
+    events, complete = log.since(1)
+    assert complete
+    assert [event.data["number"] for event in events] == [17, 42]
+    assert log.since(3) == ([], True)
+
+
+def test_since_past_the_log_is_incomplete():
+    # A client that saw more events than this log holds (e.g. before a restart) needs a snapshot
+    log = GameEventLog()
+    log.publish("call", {"number": 5})
+    assert log.since(9) == ([], False)
+    assert log.wait(9, 0.01) == ([], False)
+
+
+def test_since_before_the_oldest_kept_event_is_incomplete():
+    log = GameEventLog(maxlen=2)
+    for number in (5, 17, 42):
+        log.publish("call", {"number": number})
+    events, complete = log.since(0)
+    assert not complete
+    assert [event.seq for event in events] == [2, 3]
+    assert log.since(1)[1]
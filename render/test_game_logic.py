@@ -0,0 +1,102 @@
+# test_game_logic.py — regression tests for BingoGame (run with: python -m pytest)
+import random
+
+from game_logic import BingoGame, Cartela, FREE_CELL, winning_pattern
+
+
+def play(seed: str, players: int = 100) -> BingoGame:
+    # Manual-mode players keep the scheduler out of it; auto_call draws until someone wins
+    game = BingoGame(game_id=0, seed=seed)
+    game.min_players = players
+    for user_id in range(1, players + 1):
+        game.add_player(user_id, mode="manual")
+    while game.status == "active":
+        game.auto_call(None, None)
+    return game
+
+
+def tied_game() -> BingoGame:
+    for index in range(200):
+        game = play(f"t{index}")
+        if len(game.winner_ids) > 1:
+            return game
+    raise AssertionError("no tie in 200 seeded games")
+
+
+def test_tie_splits_pool_equally():
+    game = tied_game()
+    commission = int(game.pool * 0.20)
+    shares = set(game.payouts.values())
+    assert len(shares) == 1
+    assert sorted(game.payouts) == sorted(game.winner_ids)
+    assert sum(game.payouts.values()) + game.admin_earnings == game.pool
+    assert game.admin_earnings >= commission
+
+
+def test_late_claim_does_not_resettle():
+    game = tied_game()
+    payouts = dict(game.payouts)
+    winners = list(game.winner_ids)
+    for user_id in winners:
+        assert game.end_game(user_id) is False
+    assert game.settle([(winners[-1], 0, "Winner")]) is False
+    assert game.payouts == payouts
+    assert game.winner_ids == winners
+
+
+def test_every_draw_is_marked_on_boards():
+    # Includes the ball drawn by start_game, which used to skip evaluate_call
+    game = BingoGame(game_id=0, seed="first-draw")
+    game.min_players = 100
+    for user_id in range(1, 101):
+        game.add_player(user_id, mode="manual")
+    for _ in range(3):
+        game.auto_call(None, None)
+    called = set(game.called_numbers)
+    for cartela in game.cartelas:
+        assert called & set(cartela.board) <= set(cartela.marked())
+
+
+def legacy_check(board, marked_numbers) -> bool:
+    # The scan check_winner did over marked numbers before win detection moved to bitmasks
+    marked = set(marked_numbers)
+    lines = [list(range(i, i + 5)) for i in range(0, 25, 5)]
+    lines += [list(range(i, 25, 5)) for i in range(5)]
+    lines += [[0, 6, 12, 18, 24], [4, 8, 12, 16, 20], [0, 4, 20, 24]]
+    return any(all(board[cell] in marked for cell in line) for line in lines)
+
+
+def test_bitmask_and_legacy_win_detection_agree():
+    rng = random.Random(7)
+    game = BingoGame(game_id=0, seed="legacy")
+    for cartela_number in range(1, 101):
+        board = bytes(game.generate_board(cartela_number))
+        for _ in range(20):
+            cartela = Cartela(1, cartela_number, board)
+            for cell in rng.sample(range(25), rng.randint(0, 24)):
+                cartela.mask |= 1 << cell
+            assert (winning_pattern(cartela.mask) is not None) == legacy_check(board, cartela.marked())
+            assert cartela.mask >> FREE_CELL & 1
+
+
+def test_verify_draws():
+    game = play("verify")
+    called = list(game.called_numbers)
+    assert BingoGame.verify_draws(game.seed, game.seed_hash, called)
+    assert not BingoGame.verify_draws(game.seed, BingoGame.hash_seed("other"), called)
+    assert not BingoGame.verify_draws("other", game.seed_hash, called)
+    tampered = called[:]
+    tampered[0], tampered[1] = tampered[1], tampered[0]
+    assert not BingoGame.verify_draws(game.seed, game.seed_hash, tampered)
+
+
+def test_verify_draws_skips_manual_calls():
+    game = BingoGame(game_id=0, seed="manual")
+    deck = BingoGame.deck_for_seed("manual")
+    game.record_call(deck[0])
+    game.manual_call(deck[5])
+    game.record_call(deck[1])
+    game.manual_call(deck[2])
+    game.record_call(deck[3])
+    assert BingoGame.verify_draws(game.seed, game.seed_hash, game.called_numbers, game.manual_numbers)
+    assert not BingoGame.verify_draws(game.seed, game.seed_hash, game.called_numbers)
@@ -0,0 +1,24 @@
+# test_outbox.py — Outbox shutdown (run with: python -m pytest)
+import asyncio
+
+from outbox import Outbox, FakeBot
+
+
+def test_stop_cancels_submitted_work():
+    outbox = Outbox(bot=FakeBot(latency=0.5), rate=5)
+    cancelled = []
+
+    async def fan_out():
+        try:
+            await asyncio.gather(*(outbox.bucket.acquire() for _ in range(50)))
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    future = outbox.submit(fan_out())
+    outbox.send(1, "hello")
+    outbox.stop(timeout=0.2)
+    assert outbox._loop.is_closed()
+    assert not asyncio.all_tasks(outbox._loop)
+    assert cancelled and future.cancelled()
+    assert outbox.submit(fan_out()) is None
@@ -0,0 +1,71 @@
+# test_registry.py — GameRegistry eviction (run with: python -m pytest)
+import threading
+import time
+
+import pytest
+
+from registry import GameRegistry, RegistryFull
+
+
+def test_idle_waiting_rooms_expire():
+    registry = GameRegistry(waiting_ttl=0.05)
+    idle = registry.create()
+    busy = registry.create()
+    busy.min_players = 100
+    time.sleep(0.06)
+    with busy.lock:
+        busy.add_player(1)
+    assert registry.evict() == 1
+    assert idle.game_id not in registry
+    assert idle.status == "expired"
+    assert busy.game_id in registry
+    assert registry.counts()["waiting"] == 1
+
+
+def test_room_in_use_is_not_expired():
+    registry = GameRegistry(waiting_ttl=0)
+    game = registry.create()
+    held, release = threading.Event(), threading.Event()
+
+    def join():
+        with game.lock:
+            held.set()
+            release.wait(1)
+
+    thread = threading.Thread(target=join)
+    thread.start()
+    held.wait(1)
+    assert registry.evict() == 0
+    release.set()
+    thread.join()
+    assert registry.evict() == 1
+
+
+def test_finished_games_evicted_with_waiting_rooms():
+    registry = GameRegistry(finished_ttl=0, waiting_ttl=3600)
+    finished = registry.create()
+    finished.status = "finished"
+    waiting = registry.create()
+    assert finished.game_id not in registry
+    assert waiting.game_id in registry
+
+
+def test_id_is_allocated_outside_the_registry_lock():
+    registry = GameRegistry(max_live=2)
+    other = registry.create()
+    seen = []
+
+    def next_id(entry_price):
+        # Another thread can still take the registry lock while the id is being allocated
+        thread = threading.Thread(target=lambda: seen.append(registry.by_status("waiting")))
+        thread.start()
+        thread.join(1)
+        return 100
+
+    registry.next_id = next_id
+    game = registry.create()
+    assert seen == [[other]]
+    assert game.game_id == 100
+    registry.next_id = lambda entry_price: 101
+    with pytest.raises(RegistryFull):
+        registry.create()
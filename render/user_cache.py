@@ -0,0 +1,94 @@
+# user_cache.py — hot per-telegram_id user snapshots for the bot
+#
+# Lookups hit the database once per USER_CACHE_TTL per active player. Only profile fields are
+# cached; money never is, because the web app moves balances from another process and this
+# cache would not see it — read balances fresh (bot_db.fetch_balance). Writes in this process
+# invalidate entries after their transaction commits: ORM changes to User rows are picked up
+# automatically, and Core updates call mark_changed(). Profile changes made by another process
+# show up once the entry's TTL runs out.
+from typing import Dict, NamedTuple, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from cache import TTLCache
+from config import USER_CACHE_SIZE, USER_CACHE_TTL
+from models import db, User
+
+_MISSING = object()
+
+
+class UserSnapshot(NamedTuple):
+    id: int
+    telegram_id: int
+    language: str
+    play_mode: str
+    sound_enabled: bool
+
+
+class UserCache:
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._telegram_ids: Dict[int, int] = {}  # user id -> telegram_id, for invalidation by id
+
+    def peek(self, telegram_id) -> Optional[UserSnapshot]:
+        # Cache only, safe on the event loop; counts as a hit or a miss
+        return self._cache.get(int(telegram_id))
+
+    def load(self, telegram_id) -> Optional[UserSnapshot]:
+        # Reads through to the database; needs an app context
+        row = db.session.execute(
+            db.select(User.id, User.telegram_id, User.language, User.play_mode, User.sound_enabled)
+            .filter_by(telegram_id=int(telegram_id))
+        ).first()
+        if row is None:
+            return None
+        snapshot = UserSnapshot(*row)
+        self._cache.set(snapshot.telegram_id, snapshot)
+        self._telegram_ids[snapshot.id] = snapshot.telegram_id
+        return snapshot
+
+    def get(self, telegram_id) -> Optional[UserSnapshot]:
+        snapshot = self.peek(telegram_id)
+        return snapshot if snapshot is not None else self.load(telegram_id)
+
+    def invalidate(self, telegram_id: Optional[int] = None, user_id: Optional[int] = None):
+        if user_id is not None:
+            telegram_id = self._telegram_ids.pop(user_id, telegram_id)
+        if telegram_id is not None:
+            self._cache.pop(int(telegram_id))
+
+    def clear(self):
+        self._cache.clear()
+        self._telegram_ids.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+
+user_cache = UserCache()
+
+# -------------------- INVALIDATION ON COMMIT --------------------
+
+def mark_changed(session: Session, user_id: int):
+    # For writes that bypass the ORM; the entry is dropped once the transaction commits
+    session.info.setdefault("changed_users", set()).add(user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context):
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            mark_changed(session, obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session):
+    changed: Set[int] = session.info.pop("changed_users", set())
+    for user_id in changed:
+        user_cache.invalidate(user_id=user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session):
+    session.info.pop("changed_users", None)
@@ -1,11 +1,5 @@
-from telegram import Bot
-import os
-
-BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-bot = Bot(token=BOT_TOKEN)
+from outbox import outbox
 
 def notify_user(telegram_id: int, message: str):
-    try:
-        bot.send_message(chat_id=telegram_id, text=message)
-    except Exception as e:
-        print(f"Failed to notify user {telegram_id}: {e}")
+    # Queued for the outbox thread; returns before Telegram is contacted
+    outbox.send(telegram_id, message)